@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from db import CACHE_DIR, _desanitize, _serialize, get_catalog_changes
+
+
+class CatalogCache:
+    """The event catalog, kept on disk between runs and synced from /catalog_changes.
+
+    The snapshot holds the server's event summary rows (one per event name
+    and type) and the sequence number they are current to. On start the
+    homepage renders the snapshot straight away; sync() then downloads only
+    the rows changed since that sequence number.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(CACHE_DIR, "catalog.json")
+        self._lock = threading.Lock()
+        self.seq = 0
+        self._rows: Dict[str, List[Dict[str, Any]]] = {}
+        self._loaded = False
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.seq = snapshot["seq"]
+        for row in _desanitize(snapshot["events"]):
+            self._rows.setdefault(row['EventName'], []).append(row)
+
+    def _save(self) -> None:
+        rows = [row for group in self._rows.values() for row in group]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": self.seq, "events": rows}, f, default=_serialize)
+        os.replace(tmp, self.path)
+
+    def has_snapshot(self) -> bool:
+        with self._lock:
+            self._load()
+            return self.seq > 0 or bool(self._rows)
+
+    def sync(self) -> bool:
+        """Apply the server's changes since the snapshot; True if the catalog changed."""
+        with self._lock:
+            self._load()
+            since = self.seq
+        changes = get_catalog_changes(since)
+        with self._lock:
+            before = self._rows
+            self._rows = {} if changes['full'] else dict(before)
+            for name in changes['removed']:
+                self._rows.pop(name, None)
+            updated: Dict[str, List[Dict[str, Any]]] = {}
+            for row in changes['events']:
+                updated.setdefault(row['EventName'], []).append(row)
+            self._rows.update(updated)
+            # The server re-sends a few recent changes every time; they don't count
+            changed = self._rows != before
+            self.seq = changes['seq']
+            self._save()
+        return changed
+
+    def sync_in_background(self, on_changed: Callable[[], None]) -> None:
+        """Run sync() on a thread and call `on_changed` if anything changed."""
+        def _run():
+            try:
+                if self.sync():
+                    on_changed()
+            except Exception as e:
+                print(f"Catalog sync failed: {e}")
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def event_types(self) -> List[str]:
+        with self._lock:
+            self._load()
+            return sorted({row['type'] for group in self._rows.values() for row in group if row['type']})
+
+    def events(self, event_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Events in list_events' shape, soonest first, optionally of one type."""
+        with self._lock:
+            self._load()
+            groups = list(self._rows.values())
+        result = []
+        for group in groups:
+            if event_type and event_type.lower() != "all":
+                group = [row for row in group if (row['type'] or '').lower() == event_type.lower()]
+                if not group:
+                    continue
+            first = min(group, key=lambda row: row['EarliestDate'])
+            result.append({
+                'EventName': first['EventName'],
+                'type': first['type'] or None,
+                'image': first['image'],
+                'description': first['description'],
+                'EarliestDate': first['EarliestDate'],
+                'ShowCount': sum(row['ShowCount'] for row in group),
+            })
+        result.sort(key=lambda e: (e['EarliestDate'], e['EventName']))
+        return result
+
+
+# Shared by every view in this process
+catalog = CatalogCache()
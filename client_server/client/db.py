@@ -1,20 +1,215 @@
 import requests
+import hashlib
+import os
+import random
+import urllib.parse
+import time
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, date, timedelta
 import json
 from typing import Any, Dict, List, Optional, Tuple, Union
 import socket
-def listen_for_broadcast(port=37020):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("", port))
-    print(f"Listening for server IP on UDP port {port}...")
+# Where the client keeps data between runs, such as the catalog snapshot
+CACHE_DIR = os.environ.get("EVENTBITE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".eventbite"))
+
+DISCOVERY_PORT = 37020
+# Port assumed for servers that announce only their IP address
+SERVER_PORT = 5000
+# How long a request waits for an announcement when no known server answers
+DISCOVERY_TIMEOUT = 15.0
+# A server that hasn't announced itself for this long is dropped from the table
+SERVER_STALE_AFTER = 7.0
+# The last server that answered, tried first on the next start
+_SERVER_FILE = os.path.join(CACHE_DIR, "server.json")
+
+BASE_URL: Optional[str] = None
+_discovered = threading.Event()
+_discovery_lock = threading.Lock()
+_listener: Optional[threading.Thread] = None
+# Announced servers by ID: url, load (in-flight plus queued requests) and when last heard
+_servers: Dict[str, Dict[str, Any]] = {}
+# Requests this client has open per server URL, on top of the announced load
+_pending: Dict[str, int] = {}
+_servers_lock = threading.Lock()
+
+def _probe(url: str, timeout: float = 0.5) -> bool:
+    """Whether the server at `url` answers its health check."""
+    try:
+        return requests.get(f"{url}/health", timeout=timeout).ok
+    except requests.exceptions.RequestException:
+        return False
+
+def _load_saved_server() -> Optional[str]:
+    try:
+        with open(_SERVER_FILE, encoding="utf-8") as f:
+            return json.load(f)["url"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _save_server(url: str) -> None:
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = _SERVER_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"url": url}, f)
+        os.replace(tmp, _SERVER_FILE)
+    except OSError as e:
+        print(f"Could not save server address: {e}")
+
+def _use_server(url: str) -> None:
+    global BASE_URL
+    if url != BASE_URL:
+        print(f"Using server {url}")
+        BASE_URL = url
+        _save_server(url)
+
+def _parse_announcement(packet: str) -> Dict[str, Any]:
+    """A server's announcement as a table entry; older servers send just their IP address."""
+    try:
+        info = json.loads(packet)
+    except ValueError:
+        info = None
+    if not isinstance(info, dict):
+        info = {"ip": packet}
+    url = f"http://{info['ip']}:{int(info.get('port') or SERVER_PORT)}"
+    return {
+        "id": str(info.get("id") or url),
+        "url": url,
+        "load": int(info.get("in_flight", 0)) + int(info.get("queue_depth", 0)),
+    }
 
+def _on_announcement(packet: str) -> None:
+    try:
+        server = _parse_announcement(packet)
+    except (KeyError, TypeError, ValueError):
+        print(f"Ignoring announcement {packet!r}")
+        return
+    server["seen"] = time.monotonic()
+    with _servers_lock:
+        if server["id"] not in _servers:
+            print(f"Found server {server['id']} at {server['url']}")
+        _servers[server["id"]] = server
+    _discovered.set()
+
+def _listen_for_broadcasts(port: int) -> None:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind(("", port))
+    except OSError as e:
+        print(f"Server discovery unavailable, UDP port {port}: {e}")
+        return
+    sock.settimeout(1.0)
+    print(f"Listening for server announcements on UDP port {port}...")
     while True:
-        data, addr = sock.recvfrom(1024)
-        server_ip = data.decode("utf-8")
-        print(f"Detected server at IP: {server_ip}")
-        return server_ip  
-BASE_URL = "http://" + listen_for_broadcast() + ":5000"
-print(BASE_URL)
+        try:
+            data, addr = sock.recvfrom(1024)
+        except socket.timeout:
+            continue
+        _on_announcement(data.decode("utf-8", errors="replace").strip())
+
+def _start_discovery() -> None:
+    global _listener
+    with _discovery_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen_for_broadcasts, args=(DISCOVERY_PORT,), daemon=True)
+            _listener.start()
+
+def _pick_server() -> Optional[str]:
+    """URL of one of the two least loaded live servers, counting our own open requests.
+
+    Announced loads are up to two seconds old and every client sees
+    the same ones, so the pick is random between the two, weighted towards
+    the less loaded; otherwise all clients would pile onto one server
+    until the next announcement.
+    """
+    now = time.monotonic()
+    with _servers_lock:
+        for server_id in [i for i, s in _servers.items() if now - s["seen"] > SERVER_STALE_AFTER]:
+            print(f"Server {server_id} stopped announcing")
+            del _servers[server_id]
+        if not _servers:
+            _discovered.clear()
+            return None
+        loads = sorted((s["load"] + _pending.get(s["url"], 0), s["url"]) for s in _servers.values())[:2]
+    weights = [1 / (1 + load) for load, _ in loads]
+    return random.choices([url for _, url in loads], weights=weights)[0]
+
+def _base_url() -> str:
+    """Server for the next request: the one that issued our session token, else a
+    lightly loaded announced one, else the current one, else the last one saved if
+    it answers, else the next announced.
+
+    A session token is only sure to be accepted by the server that signed
+    it, so a logged-in client stays on that server and is balanced again
+    at its next login. The first server found becomes the current one,
+    saved for the next start; it only changes when it stops answering.
+    """
+    _start_discovery()
+    if _session_token and _session_server:
+        return _session_server
+    url = _pick_server()
+    if url is None and BASE_URL is not None:
+        return BASE_URL
+    if url is None:
+        saved = _load_saved_server()
+        if saved and _probe(saved):
+            url = saved
+        else:
+            _discovered.wait(DISCOVERY_TIMEOUT)
+            url = _pick_server()
+            if url is None:
+                raise requests.exceptions.ConnectionError("No EventBite server found on the network")
+    if BASE_URL is None:
+        _use_server(url)
+    return url
+
+def _track_request(url: str, delta: int) -> None:
+    with _servers_lock:
+        _pending[url] = _pending.get(url, 0) + delta
+
+def _server_unreachable(url: str) -> None:
+    """Forget `url` so the next request goes to another server, or finds one again.
+
+    The session is kept: servers sharing EVENTBITE_SESSION_SECRET accept it,
+    and any other answers 401 until the user logs in again.
+    """
+    global BASE_URL, _session_server
+    with _servers_lock:
+        for server_id in [i for i, s in _servers.items() if s["url"] == url]:
+            del _servers[server_id]
+    if BASE_URL == url:
+        BASE_URL = None
+    if _session_server == url:
+        _session_server = None
+
+def get_servers() -> List[Dict[str, Any]]:
+    """The live server table, for display: id, url, load and seconds since last heard."""
+    now = time.monotonic()
+    with _servers_lock:
+        return [dict(s, seen=round(now - s["seen"], 1), pending=_pending.get(s["url"], 0)) for s in _servers.values()]
+
+# Session token issued at login, sent with every request, and the server that issued it
+_session_token: Optional[str] = None
+_session_server: Optional[str] = None
+# Server each thread's last request went to, so a login knows who issued its token
+_last_server = threading.local()
+
+def set_session_token(token: Optional[str], server: Optional[str] = None) -> None:
+    """Use a previously issued session token, e.g. one restored from client storage,
+    and send requests to `server`, the one that issued it, while it answers."""
+    global _session_token, _session_server
+    _session_token = token
+    _session_server = server if token else None
+
+def get_session_token() -> Optional[str]:
+    return _session_token
+
+def get_session_server() -> Optional[str]:
+    return _session_server
 
 def _parse_datetime(value: str) -> date:
     """Parse date string in YYYY-MM-DD format to date object."""
@@ -25,6 +220,15 @@ def _parse_timedelta(value: str) -> timedelta:
     h, m, s = map(int, value.split(':'))
     return timedelta(hours=h, minutes=m, seconds=s)
 
+def _serialize(value: Any) -> str:
+    """json.dumps default that writes dates and times the way the server sends them."""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        total = int(value.total_seconds())
+        return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
 def _desanitize(obj: Any) -> Any:
     """Convert serialized types back to Python objects."""
     if isinstance(obj, dict):
@@ -41,23 +245,125 @@ def _desanitize(obj: Any) -> Any:
         return [_desanitize(item) for item in obj]
     return obj
 
+# Rolling logs of recent request timings and view load breakdowns, newest last
+timing_log = deque(maxlen=500)
+view_log = deque(maxlen=100)
+_view_load = threading.local()
+
+def _parse_server_timing(header: str) -> Dict[str, float]:
+    """Parse 'db;dur=1.2, total;dur=3.4' into {'db': 1.2, 'total': 3.4} (milliseconds)."""
+    timings = {}
+    for metric in filter(None, (m.strip() for m in header.split(','))):
+        name, _, params = metric.partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'dur':
+                timings[name] = float(value)
+    return timings
+
+@contextmanager
+def timing_view(view: str):
+    """Attribute requests made in this block to `view` and log where its load time went.
+
+    The breakdown splits the view's total time into network, server database,
+    server serialization, other server time, response parsing, and
+    everything else (building and rendering controls).
+    """
+    load = {'view': view, 'requests': []}
+    outer = getattr(_view_load, 'current', None)
+    _view_load.current = load
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _view_load.current = outer
+        total = (time.perf_counter() - start) * 1000
+        requests_ = load['requests']
+        server_total = sum(r['server'].get('total', 0) for r in requests_)
+        db_ms = sum(r['server'].get('db', 0) for r in requests_)
+        serialize_ms = sum(r['server'].get('serialize', 0) for r in requests_)
+        client_ms = sum(r['client_ms'] for r in requests_)
+        parse_ms = sum(r['parse_ms'] for r in requests_)
+        view_log.append({
+            'view': view,
+            'total_ms': round(total, 2),
+            'requests': len(requests_),
+            'network_ms': round(client_ms - server_total, 2),
+            'db_ms': round(db_ms, 2),
+            'serialize_ms': round(serialize_ms, 2),
+            'server_other_ms': round(server_total - db_ms - serialize_ms, 2),
+            'parse_ms': round(parse_ms, 2),
+            'render_ms': round(total - client_ms - parse_ms, 2),
+        })
+
+def get_timing_log() -> List[Dict[str, Any]]:
+    return list(timing_log)
+
+def get_view_timings() -> List[Dict[str, Any]]:
+    return list(view_log)
+
 def _make_request(endpoint: str, method: str = 'GET', **kwargs) -> Any:
     print(kwargs)
     """Make an HTTP request to the server and handle the response."""
-    url = f"{BASE_URL}/{endpoint}"
+    base_url = _base_url()
+    url = f"{base_url}/{endpoint}"
+    _track_request(base_url, 1)
+    _last_server.url = base_url
+    request_id = uuid.uuid4().hex
+    headers = {'X-Request-ID': request_id}
+    if _session_token:
+        headers['Authorization'] = f"Bearer {_session_token}"
+    start = time.perf_counter()
     try:
-        if method.upper() == 'GET':
-            response = requests.get(url, params=kwargs)
-        elif method.upper() == 'POST':
-            response = requests.post(url, json=kwargs.get('data'))
-        else:
-            raise ValueError(f"Unsupported HTTP method: {method}")
+        while True:
+            if method.upper() == 'GET':
+                try:
+                    response = requests.get(url, params=kwargs, headers=headers)
+                except requests.exceptions.ConnectionError:
+                    # Reads are safe to repeat: find a server again and retry once
+                    failed = base_url
+                    _server_unreachable(failed)
+                    base_url = _base_url()
+                    _track_request(failed, -1)
+                    _track_request(base_url, 1)
+                    _last_server.url = base_url
+                    url = f"{base_url}/{endpoint}"
+                    response = requests.get(url, params=kwargs, headers=headers)
+            elif method.upper() == 'POST':
+                response = requests.post(url, json=kwargs.get('data'), headers=headers)
+            else:
+                raise ValueError(f"Unsupported HTTP method: {method}")
+            if response.status_code != 429:
+                break
+            # Booking is busy: hold our place in the waiting room and retry
+            queued = response.json()
+            print(f"Queued for {endpoint}, position {queued['position']}")
+            headers['X-Queue-Token'] = queued['queue_token']
+            time.sleep(float(response.headers.get('Retry-After', 1)))
         
+        client_ms = (time.perf_counter() - start) * 1000
         response.raise_for_status()
-        return _desanitize(response.json())
+        parse_start = time.perf_counter()
+        result = _desanitize(response.json())
+        entry = {
+            'request_id': request_id,
+            'endpoint': endpoint,
+            'client_ms': client_ms,
+            'parse_ms': (time.perf_counter() - parse_start) * 1000,
+            'server': _parse_server_timing(response.headers.get('Server-Timing', '')),
+        }
+        timing_log.append(entry)
+        load = getattr(_view_load, 'current', None)
+        if load is not None:
+            load['requests'].append(entry)
+        return result
     except requests.exceptions.RequestException as e:
+        if isinstance(e, requests.exceptions.ConnectionError):
+            _server_unreachable(base_url)
         print(f"API request failed: {e}")
         raise
+    finally:
+        _track_request(base_url, -1)
 
 def list_events(event_type: str = None) -> List[Dict[str, Any]]:
     """List all events, optionally filtered by type."""
@@ -75,55 +381,98 @@ def get_event_shows(event_name: str) -> List[Dict[str, Any]]:
     """Get all shows for a specific event name."""
     return _make_request("get_event_shows", event_name=event_name)
 
+def get_catalog_changes(since: int = 0) -> Dict[str, Any]:
+    """Catalog summary rows changed after sequence number `since`; all of them when 0."""
+    return _make_request("catalog_changes", since=since)
+
+def image_url(event_name: str, source: Optional[str], size: str = "card") -> Optional[str]:
+    """URL of the server's resized copy of an event image; None if the event has no image.
+
+    The source URL's hash is part of the address, so a changed image is not
+    served from a stale cache entry.
+    """
+    if not source:
+        return None
+    version = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    return f"{_base_url()}/image/{urllib.parse.quote(event_name, safe='')}?size={size}&v={version}"
+
 def get_event_types() -> List[str]:
     """Get all distinct event types."""
     return _make_request("get_event_types")
 
 def register_user(username: str, password: str, name: str) -> bool:
-    """Register a new user."""
-    return _make_request(
+    """Register a new user and log them in on the server that answered."""
+    # A login picks a server afresh; the new session then stays on it
+    set_session_token(None)
+    token = _make_request(
         "register_user", 
         method='POST', 
         data={'username': username, 'password': password, 'name': name}
     )
+    if token:
+        set_session_token(token, _last_server.url)
+    return bool(token)
 
 def check_credentials(username: str, password: str) -> bool:
-    """Check if the provided credentials are valid."""
-    return _make_request(
+    """Check if the provided credentials are valid and start a session on the server that answered."""
+    # A login picks a server afresh; the new session then stays on it
+    set_session_token(None)
+    token = _make_request(
         "check_credentials", 
         method='POST', 
         data={'username': username, 'password': password}
     )
+    if token:
+        set_session_token(token, _last_server.url)
+    return bool(token)
 
 def get_venue_seats(event_id: int) -> Tuple[List[str], List[str], List[str]]:
     """Get all, unavailable, and booked seats for an event."""
     result = _make_request("get_venue_seats", event_id=event_id)
     return result['all'], result['unavailable'], result['booked']
 
-def lock_seats(selected_seats: List[str], event_id: int) -> bool:
+# Hold IDs from lock_seats by event, sent back to book or release the held seats
+_hold_ids: Dict[str, str] = {}
+
+def lock_seats(selected_seats: List[str], event_id: int) -> Tuple[bool, List[str]]:
+    """Hold the seats for this client, all of them or none.
+
+    Returns:
+        Whether they are held, and the seats someone else already holds or booked.
+    """
     print(selected_seats, event_id)
-    return _make_request(
+    result = _make_request(
         "lock_seats", 
         method='POST', 
-        data={'selected_seats': selected_seats, 'event_id': event_id}
+        data={'selected_seats': selected_seats, 'event_id': event_id, 'hold_id': _hold_ids.get(str(event_id))}
     )
+    if result['held']:
+        _hold_ids[str(event_id)] = result['hold_id']
+    return result['held'], result['conflicts']
 
 def create_ticket(event_id: int, username: str, seats: List[str]) -> Optional[int]:
-
-    return _make_request(
+    """Book the seats, taking over this client's hold on them."""
+    result = _make_request(
         "create_ticket",
         method='POST',
-        data={'event_id': event_id, 'username': username, 'seats': seats}
+        data={'event_id': event_id, 'seats': seats, 'hold_id': _hold_ids.get(str(event_id))}
     )
+    _hold_ids.pop(str(event_id), None)
+    return result
 
-def get_user_tickets(username: str) -> List[Dict[str, Any]]:
-    """Get all tickets for a user."""
-    return _make_request("get_user_tickets", username=username)
+def get_user_tickets(username: str, since: int = 0) -> List[Dict[str, Any]]:
+    """Get the logged-in user's tickets, or only those with a TicketID above `since`."""
+    if since:
+        return _make_request("get_user_tickets", since=since)
+    return _make_request("get_user_tickets")
 
 def release_locked_seats(event_id: int, seats: List[str]) -> None:
-    """Release locked seats after a delay."""
+    """Give up this client's hold on the seats before it expires."""
+    hold_id = _hold_ids.get(str(event_id))
+    if not hold_id:
+        return
     _make_request(
         "release_locked_seats",
         method='POST',
-        data={'event_id': event_id, 'seats': seats}
+        data={'event_id': event_id, 'seats': seats, 'hold_id': hold_id}
     )
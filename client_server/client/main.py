@@ -2,18 +2,22 @@ import flet as ft
 import json
 import urllib.parse
 from db import (
-    list_events,
     get_event_shows,
-    get_event_types,
     check_credentials,
     get_venue_seats,
     lock_seats,
     create_ticket,
-    get_user_tickets,
     release_locked_seats,
     register_user,
     get_event_name,
+    get_session_token,
+    get_session_server,
+    set_session_token,
+    image_url,
+    timing_view,
 )
+from catalog import catalog
+from wallet import TicketWallet
 
 def create_auth_view(page, is_register=False):
     def handle_auth(e):
@@ -36,6 +40,8 @@ def create_auth_view(page, is_register=False):
                 page.session.set("username", username)
                 page.client_storage.set("is_logged_in", True)
                 page.client_storage.set("username", username)
+                page.client_storage.set("session_token", get_session_token())
+                page.client_storage.set("session_server", get_session_server())
                 page.go("/")
             else:
                 update_error("Username already exists")
@@ -45,6 +51,8 @@ def create_auth_view(page, is_register=False):
                 page.session.set("username", username)
                 page.client_storage.set("is_logged_in", True)
                 page.client_storage.set("username", username)
+                page.client_storage.set("session_token", get_session_token())
+                page.client_storage.set("session_server", get_session_server())
                 page.go("/")
             else:
                 update_error("Invalid username or password")
@@ -117,7 +125,7 @@ class EventCard(ft.Container):
             content=ft.Stack([
 
                 ft.Image(
-                    src=event['image'] or "https://linda-hoang.com/wp-content/uploads/2014/10/img-placeholder-dark.jpg",
+                    src=image_url(event['EventName'], event['image'], "card") or "https://linda-hoang.com/wp-content/uploads/2014/10/img-placeholder-dark.jpg",
                     fit=ft.ImageFit.COVER, width=180, height=240, border_radius=10,
                 ),
                 ft.Container(
@@ -191,8 +199,13 @@ def create_show_details_view_single(page, event_id):
         ],
         horizontal_alignment=ft.CrossAxisAlignment.CENTER
     )
-def create_homepage_view(page):
-    event_types = ['All'] + get_event_types()
+def create_homepage_view(page, sync=True):
+    # Render the catalog saved on disk; only the very first start waits for the server
+    if not catalog.has_snapshot():
+        catalog.sync()
+    elif sync:
+        catalog.sync_in_background(lambda: refresh_homepage(page))
+    event_types = ['All'] + catalog.event_types()
     
     # Create a class to hold the search state
     class SearchState:
@@ -258,6 +271,9 @@ def create_homepage_view(page):
                         icon=ft.Icons.LOGOUT,
                         on_click=lambda e: (
                             page.client_storage.set("is_logged_in", False),
+                            page.client_storage.remove("session_token"),
+                            page.client_storage.remove("session_server"),
+                            set_session_token(None),
                             page.session.set("is_logged_in", False),
                             page.go("/login")
                         ),
@@ -275,8 +291,14 @@ def create_homepage_view(page):
         spacing=0,
     )
 
+def refresh_homepage(page):
+    """Re-render the homepage from the catalog if it is still on screen."""
+    if page.route == "/" and page.views:
+        page.views[-1] = create_homepage_view(page, sync=False)
+        page.update()
+
 def create_events_grid(page, event_type, search_query=None):
-    events = list_events(event_type if event_type != 'All' else None)
+    events = catalog.events(event_type if event_type != 'All' else None)
     
     # Filter events by search query if provided
     if search_query and search_query.strip():
@@ -400,7 +422,7 @@ def create_show_details_view(page, event_name):
                 content=ft.Column([
                     ft.Container(
                         content=ft.Image(
-                            src=shows[0]['image'] or "https://linda-hoang.com/wp-content/uploads/2014/10/img-placeholder-dark.jpg",
+                            src=image_url(event_name, shows[0]['image'], "banner") or "https://linda-hoang.com/wp-content/uploads/2014/10/img-placeholder-dark.jpg",
                             width=page.width, height=200, fit=ft.ImageFit.COVER,
                         ),
                         border_radius=ft.border_radius.only(bottom_left=20, bottom_right=20),
@@ -430,7 +452,16 @@ def create_seating_view(page, event_id):
     def book_clicked(e):
         selected_labels = [label for label, checkbox in seat_controls.items() if checkbox.value and not checkbox.disabled]
         if selected_labels:
-            lock_seats(selected_labels, event_id)
+            held, conflicts = lock_seats(selected_labels, event_id)
+            if not held:
+                # Someone got there first: show those seats as taken
+                for label in conflicts:
+                    seat_controls[label].value = True
+                    seat_controls[label].disabled = True
+                feedback_text.value = (f"Seats just taken: {', '.join(conflicts)}" if conflicts
+                                       else "Could not hold your seats, please try again.")
+                page.update()
+                return
             encoded_seats = urllib.parse.quote(json.dumps(selected_labels))
             page.go(f"/payment/{event_id}/{encoded_seats}")
         else:
@@ -504,6 +535,8 @@ def create_payment_view(page, event_id, encoded_labels):
             
         ticket_id = create_ticket(event_id, username, selected_labels)
         if ticket_id:
+            # Get the new ticket onto the device while the user is still online
+            TicketWallet(page.client_storage, username).sync_in_background()
             page.go('/')
         else:
             pass
@@ -572,63 +605,51 @@ def create_tickets_view(page):
     if not username:
         page.go("/login")
         return
-    
-    tickets = get_user_tickets(username)
-    
-    ticket_items = []
-    for ticket in tickets:
-        try:
-            seats = json.loads(ticket['Seats'])
-        except (json.JSONDecodeError, TypeError):
-            seats = [s.strip() for s in str(ticket['Seats']).split(',')]
-            
-        ticket_items.append(
-            ft.Card(
-                content=ft.Container(
-                    content=ft.Column(
-                        [
-                            ft.ListTile(
-                                leading=ft.Icon(ft.Icons.CONFIRMATION_NUMBER),
-                                title=ft.Text(f"{ticket['EventName']}"),
-                                subtitle=ft.Text(
-                                    f"{ticket['Date']} at {ticket['StartTime']}\n"
-                                    f"Venue: {ticket['VenueName']}\n"
-                                    f"Seats: {', '.join(seats)}"
-                                ),
-                            ),
-                        ],
-                        spacing=0,
-                    ),
-                    padding=10,
-                ),
-                margin=5,
+
+    # Open from the tickets saved on the device, then fetch anything newer
+    wallet = TicketWallet(page.client_storage, username)
+    body = ft.Column(spacing=20, expand=True)
+
+    def render(tickets, status=None):
+        ticket_list = ft.ListView(expand=True, spacing=10, padding=20)
+        for ticket in tickets:
+            ticket_control = ft.ListTile(
+                title=ft.Text(f"{ticket['EventName']}"),
+                subtitle=ft.Text(f"{ticket['Date'].strftime('%b %d, %Y')} • {ticket['StartTime']}"),
+                trailing=ft.Text(f"#{ticket['TicketID']}", style=ft.TextThemeStyle.BODY_SMALL),
+                on_click=lambda e, t=ticket: show_ticket_details(t),
             )
-        )
-    
-    if not ticket_items:
-        ticket_items.append(
-            ft.Container(
-                content=ft.Column(
-                    [
-                        ft.Icon(ft.Icons.CONFIRMATION_NUMBER, size=48, color=ft.Colors.GREY_400),
-                        ft.Text("No tickets found", size=16, color=ft.Colors.GREY_600),
-                    ],
-                    horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                    spacing=10,
-                ),
-                padding=20,
-                alignment=ft.alignment.center,
+            ticket_list.controls.append(ticket_control)
+
+        summary = f"Showing {len(tickets)} ticket{'s' if len(tickets) != 1 else ''}"
+        body.controls = [
+            ft.Divider(),
+            ft.Text(f"{summary} • {status}" if status else summary,
+                   style=ft.TextThemeStyle.BODY_MEDIUM, color=ft.Colors.ON_SURFACE_VARIANT),
+            ticket_list if tickets else ft.Container(
+                content=ft.Column([
+                    ft.Icon(ft.Icons.CONFIRMATION_NUMBER_OUTLINED, size=48),
+                    ft.Text("No tickets found", style=ft.TextThemeStyle.BODY_LARGE),
+                    ft.Text("You haven't booked any tickets yet.", style=ft.TextThemeStyle.BODY_MEDIUM),
+                    ft.FilledTonalButton("Browse Events", on_click=lambda e: page.go("/"), icon=ft.Icons.EVENT_AVAILABLE)
+                ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=20),
+                alignment=ft.alignment.center, padding=40, expand=True,
             )
-        )
-    ticket_list = ft.ListView(expand=True, spacing=10, padding=20)
-    for ticket in tickets:
-        ticket_control = ft.ListTile(
-            title=ft.Text(f"{ticket['EventName']}"),
-            subtitle=ft.Text(f"{ticket['Date'].strftime('%b %d, %Y')} • {ticket['StartTime']}"),
-            trailing=ft.Text(f"#{ticket['TicketID']}", style=ft.TextThemeStyle.BODY_SMALL),
-            on_click=lambda e, t=ticket: show_ticket_details(t),
-        )
-        ticket_list.controls.append(ticket_control)
+        ]
+
+    def on_synced(added):
+        if added is None:
+            status = "Offline, showing saved tickets" if wallet.has_synced() else "Couldn't reach the server"
+        else:
+            status = None
+        render(wallet.tickets(), status)
+        page.update()
+
+    if wallet.has_synced():
+        render(wallet.tickets(), "Updating…")
+    else:
+        body.controls = [ft.Divider(), ft.Row([ft.ProgressRing(width=16, height=16), ft.Text("Loading tickets…")], spacing=10)]
+    wallet.sync_in_background(on_synced)
 
     return ft.View(
         "/tickets",
@@ -638,20 +659,7 @@ def create_tickets_view(page):
                 title=ft.Text("My Tickets"), center_title=True, bgcolor="surface_variant"
             ),
             ft.Container(
-                content=ft.Column([
-                    ft.Divider(),
-                    ft.Text(f"Showing {len(tickets)} ticket{'s' if len(tickets) != 1 else ''}", 
-                           style=ft.TextThemeStyle.BODY_MEDIUM, color=ft.Colors.ON_SURFACE_VARIANT),
-                    ticket_list if tickets else ft.Container(
-                        content=ft.Column([
-                            ft.Icon(ft.Icons.CONFIRMATION_NUMBER_OUTLINED, size=48),
-                            ft.Text("No tickets found", style=ft.TextThemeStyle.BODY_LARGE),
-                            ft.Text("You haven't booked any tickets yet.", style=ft.TextThemeStyle.BODY_MEDIUM),
-                            ft.FilledTonalButton("Browse Events", on_click=lambda e: page.go("/"), icon=ft.Icons.EVENT_AVAILABLE)
-                        ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=20),
-                        alignment=ft.alignment.center, padding=40, expand=True,
-                    )
-                ], spacing=20, expand=True),
+                content=body,
                 padding=20, expand=True,
             )
         ],
@@ -664,7 +672,12 @@ def main(page: ft.Page):
     # page.theme_mode = ft.ThemeMode.DARK
     
     
-    def route_change(route):
+    # Resume the saved session; without a token the user has to log in again
+    set_session_token(page.client_storage.get("session_token"), page.client_storage.get("session_server"))
+    if not get_session_token():
+        page.client_storage.set("is_logged_in", False)
+
+    def show_route(route):
         page.views.clear()
         if page.route == "/login":
             if page.client_storage.get("is_logged_in"):
@@ -700,6 +713,10 @@ def main(page: ft.Page):
                 
         page.update()
 
+    def route_change(route):
+        with timing_view(page.route):
+            show_route(route)
+
     def view_pop(view):
         page.views.pop()
         top_view = page.views[-1]
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The client modules import each other as top-level modules, the way main.py runs them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+@pytest.fixture
+def client_db(tmp_path, monkeypatch):
+    """db with a clean server table, no UDP listener, and its files under tmp_path."""
+    import db
+    monkeypatch.setattr(db, "_start_discovery", lambda: None)
+    monkeypatch.setattr(db, "_SERVER_FILE", str(tmp_path / "server.json"))
+    monkeypatch.setattr(db, "BASE_URL", None)
+    monkeypatch.setattr(db, "_servers", {})
+    monkeypatch.setattr(db, "_pending", {})
+    db.set_session_token(None)
+    yield db
+    db.set_session_token(None)
@@ -0,0 +1,82 @@
+import json
+
+import requests
+
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code}", response=self)
+
+
+class _Servers:
+    """Two servers with their own session secrets: a token only works where it was issued."""
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.calls = []
+
+    def handle(self, url, headers):
+        base, _, endpoint = url.rpartition("/")
+        self.calls.append((base, endpoint))
+        if endpoint == "check_credentials":
+            return _Response(200, f"token-from-{base}")
+        if headers.get("Authorization") != f"Bearer token-from-{base}":
+            return _Response(401, {"error": "Not logged in"})
+        return _Response(200, {"TicketID": 1} if endpoint == "create_ticket" else [])
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        return self.handle(url, headers or {})
+
+    def post(self, url, json=None, headers=None, **kwargs):
+        return self.handle(url, headers or {})
+
+
+def _announce(db, port, load=0):
+    db._on_announcement(json.dumps({"id": f"s{port}", "ip": "10.0.0.1", "port": port, "in_flight": load}))
+
+
+def _run(client_db, monkeypatch):
+    servers = _Servers(["http://10.0.0.1:5001", "http://10.0.0.1:5002"])
+    monkeypatch.setattr(requests, "get", servers.get)
+    monkeypatch.setattr(requests, "post", servers.post)
+    _announce(client_db, 5001)
+    _announce(client_db, 5002)
+    return servers
+
+
+def test_logged_in_client_books_on_the_server_that_issued_its_token(client_db, monkeypatch):
+    servers = _run(client_db, monkeypatch)
+    assert client_db.check_credentials("alice", "secret")
+    issuer = client_db.get_session_server()
+    # The other server is now the less loaded one; the session still stays put
+    other = next(url for url in servers.urls if url != issuer)
+    _announce(client_db, int(issuer.rsplit(":", 1)[1]), load=50)
+    for _ in range(20):
+        assert client_db.create_ticket(1, "alice", ["A1"]) == {"TicketID": 1}
+        assert client_db.get_user_tickets("alice") == []
+    booked_on = {base for base, endpoint in servers.calls if endpoint != "check_credentials"}
+    assert booked_on == {issuer} and other not in booked_on
+
+
+def test_login_is_balanced_again_and_a_lost_issuer_unpins(client_db, monkeypatch):
+    servers = _run(client_db, monkeypatch)
+    issuers = set()
+    for _ in range(30):
+        client_db.check_credentials("alice", "secret")
+        issuers.add(client_db.get_session_server())
+    assert issuers == set(servers.urls)
+    issuer = client_db.get_session_server()
+    client_db._server_unreachable(issuer)
+    assert client_db.get_session_server() is None
+    assert client_db.get_session_token()
+    assert client_db._base_url() != issuer
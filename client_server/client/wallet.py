@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from db import _desanitize, _serialize, get_user_tickets
+
+# Serializes merges into the store from the view and from background syncs
+_lock = threading.Lock()
+
+# A sync this long after the last full one fetches every ticket again and
+# replaces the stored copy, so nothing a delta sync missed lingers
+FULL_SYNC_INTERVAL = 24 * 3600
+
+
+class TicketWallet:
+    """A user's tickets kept in the app's client storage.
+
+    The tickets view reads the stored copy, so it opens without the
+    network. sync() then asks the server only for tickets newer than the
+    newest one on the device (the server adds an overlap for tickets whose
+    IDs arrive out of order), and once a day for all of them.
+    """
+
+    def __init__(self, storage, username: str):
+        self.storage = storage
+        self.username = username
+        self.key = f"wallet.{username}"
+        self.full_sync_key = f"wallet.{username}.full_sync"
+
+    def _load(self) -> Optional[List[Dict[str, Any]]]:
+        stored = self.storage.get(self.key)
+        return None if stored is None else json.loads(stored)
+
+    def has_synced(self) -> bool:
+        """False until the first sync on this device has stored something."""
+        return self.storage.contains_key(self.key)
+
+    def tickets(self) -> List[Dict[str, Any]]:
+        """Stored tickets: upcoming shows first, then past ones, latest show first in each."""
+        tickets = _desanitize(self._load() or [])
+        tickets.sort(key=lambda t: (t['Date'], t['StartTime']), reverse=True)
+        today = date.today()
+        tickets.sort(key=lambda t: t['Date'] < today)
+        return tickets
+
+    def sync(self, full: bool = False) -> int:
+        """Fetch tickets created since the newest stored one, or all of them when `full`
+        or the last full sync is older than FULL_SYNC_INTERVAL; returns how many were new."""
+        started = time.time()
+        full = full or started - (self.storage.get(self.full_sync_key) or 0) > FULL_SYNC_INTERVAL
+        with _lock:
+            stored = self._load() or []
+            since = 0 if full else max((ticket['TicketID'] for ticket in stored), default=0)
+        fetched = get_user_tickets(self.username, since=since)
+        with _lock:
+            stored = {ticket['TicketID']: ticket for ticket in self._load() or []}
+            added = sum(1 for ticket in fetched if ticket['TicketID'] not in stored)
+            if full:
+                stored = {}
+            for ticket in fetched:
+                stored[ticket['TicketID']] = ticket
+            self.storage.set(self.key, json.dumps(list(stored.values()), default=_serialize))
+            if full:
+                self.storage.set(self.full_sync_key, started)
+        return added
+
+    def sync_in_background(self, on_done: Callable[[Optional[int]], None] = None) -> None:
+        """Run sync() on a thread; `on_done` gets the number of new tickets, or None if it failed."""
+        def _run():
+            try:
+                added = self.sync()
+            except Exception as e:
+                print(f"Ticket sync failed: {e}")
+                added = None
+            if on_done:
+                on_done(added)
+
+        threading.Thread(target=_run, daemon=True).start()
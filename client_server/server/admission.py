@@ -0,0 +1,122 @@
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+
+class AdmissionController:
+    """Per-event admission control for the booking path.
+
+    At most `max_active` requests per event run at once. Everyone else is
+    queued in arrival order and handed a position token; a queued request
+    waits up to `wait_timeout` seconds for its turn and otherwise gives the
+    token back to the client, which retries with it to keep its place.
+
+    Clients are told to retry after `retry_after` seconds. A token at the
+    head of its queue that hasn't come back within `token_ttl` (by default
+    two retry periods) is dropped, so a client that gave up doesn't hold up
+    everyone behind it.
+    """
+
+    def __init__(self, max_active: int = 20, wait_timeout: float = 2.0, token_ttl: Optional[float] = None,
+                 retry_after: int = 1):
+        self.max_active = max_active
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self.token_ttl = 2 * retry_after if token_ttl is None else token_ttl
+        self._cond = threading.Condition()
+        self._active: Dict[Any, int] = {}
+        self._queues: Dict[Any, deque] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._waiting: Dict[str, int] = {}
+        self._admits = deque()
+
+    def acquire(self, event_id: Any, token: Optional[str] = None) -> Tuple[bool, Optional[str], int]:
+        """Try to admit a request for `event_id`.
+
+        Returns:
+            (admitted, token, position): `token` and `position` are only
+            meaningful when the request was not admitted.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        with self._cond:
+            queue = self._queues.setdefault(event_id, deque())
+            self._expire(event_id, queue)
+            # Tokens are only good for the queue that issued them; an expired
+            # token, or one from another event's queue, joins at the back
+            if token not in queue:
+                if not queue and self._active.get(event_id, 0) < self.max_active:
+                    self._admit(event_id)
+                    return True, None, 0
+                token = uuid.uuid4().hex
+                queue.append(token)
+            self._last_seen[token] = time.monotonic()
+            # A token whose request is waiting here is alive however long it waits
+            self._waiting[token] = self._waiting.get(token, 0) + 1
+            try:
+                while True:
+                    self._expire(event_id, queue)
+                    if token not in queue:
+                        # Another request with the same token took its turn; queue again
+                        self._unwait(token)
+                        token = uuid.uuid4().hex
+                        queue.append(token)
+                        self._last_seen[token] = time.monotonic()
+                        self._waiting[token] = 1
+                    if queue[0] == token and self._active.get(event_id, 0) < self.max_active:
+                        queue.popleft()
+                        del self._last_seen[token]
+                        self._admit(event_id)
+                        self._cond.notify_all()
+                        return True, None, 0
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._last_seen[token] = time.monotonic()
+                        return False, token, queue.index(token) + 1
+                    # Wake up now and then to drop a head whose client has gone
+                    self._cond.wait(min(remaining, self.token_ttl))
+            finally:
+                self._unwait(token)
+
+    def release(self, event_id: Any) -> None:
+        with self._cond:
+            self._active[event_id] -= 1
+            if not self._active[event_id]:
+                del self._active[event_id]
+                if not self._queues.get(event_id):
+                    self._queues.pop(event_id, None)
+            self._cond.notify_all()
+
+    def stats(self, event_id: Any = None) -> Dict[str, Any]:
+        """Queue depth, in-flight count and admits per second over the last minute."""
+        with self._cond:
+            now = time.monotonic()
+            while self._admits and now - self._admits[0] > 60:
+                self._admits.popleft()
+            if event_id is not None:
+                events = [event_id]
+            else:
+                events = set(self._queues) | set(self._active)
+            return {
+                "queue_depth": sum(len(self._queues.get(e, ())) for e in events),
+                "active": sum(self._active.get(e, 0) for e in events),
+                "admit_rate": round(len(self._admits) / 60, 3),
+                "max_active": self.max_active,
+            }
+
+    def _admit(self, event_id: Any) -> None:
+        self._active[event_id] = self._active.get(event_id, 0) + 1
+        self._admits.append(time.monotonic())
+
+    def _unwait(self, token: str) -> None:
+        self._waiting[token] -= 1
+        if not self._waiting[token]:
+            del self._waiting[token]
+
+    def _expire(self, event_id: Any, queue: deque) -> None:
+        """Drop tokens whose holders stopped retrying so they don't block the queue."""
+        now = time.monotonic()
+        while queue and queue[0] not in self._waiting \
+                and now - self._last_seen.get(queue[0], now) > self.token_ttl:
+            self._last_seen.pop(queue.popleft(), None)
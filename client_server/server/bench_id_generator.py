@@ -0,0 +1,50 @@
+"""Benchmark the ticket ID generator and check uniqueness across processes.
+
+Usage: python bench_id_generator.py [--processes N] [--ids-per-process M]
+"""
+import argparse
+import multiprocessing
+import time
+
+from id_generator import SnowflakeGenerator
+
+
+def _generate(count: int, results) -> None:
+    generator = SnowflakeGenerator()
+    results.put([generator.next_id() for _ in range(count)])
+
+
+def benchmark(count: int) -> float:
+    generator = SnowflakeGenerator()
+    start = time.perf_counter()
+    for _ in range(count):
+        generator.next_id()
+    return count / (time.perf_counter() - start)
+
+
+def stress(processes: int, ids_per_process: int) -> None:
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_generate, args=(ids_per_process, results)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    batches = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    all_ids = [i for batch in batches for i in batch]
+    duplicates = len(all_ids) - len(set(all_ids))
+    unordered = sum(1 for batch in batches if batch != sorted(batch) or len(set(batch)) != len(batch))
+    print(f"{len(all_ids)} IDs from {processes} processes: {duplicates} duplicates, "
+          f"{unordered} processes with non-monotonic IDs")
+    if duplicates or unordered:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--ids-per-process", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"Single process: {benchmark(args.ids_per_process):,.0f} IDs/s")
+    stress(args.processes, args.ids_per_process)
@@ -0,0 +1,60 @@
+"""Compare plain and prepared execution of the named statements in statements.py.
+
+Runs each read statement `--calls` times as plain SQL text and again
+through the per-connection prepared statement, on the configured backend
+(config.DB_BACKEND). On MySQL it also prints the session's statement
+counters: the prepared run should show a single Com_stmt_prepare per
+statement against thousands of executes.
+
+Usage: python bench_statements.py [--calls N] [--event-id ID] [--username NAME]
+"""
+import argparse
+import time
+
+from connection import open_database
+from schema import apply_migrations
+from statements import STATEMENTS
+
+READS = ("get_event_name", "venue_layout", "event_tickets", "event_holds", "check_credentials")
+
+
+def _counters(db) -> dict:
+    if getattr(db, "path", None):
+        return {}
+    rows = db.execute("SHOW SESSION STATUS WHERE Variable_name IN ('Com_stmt_prepare', 'Com_stmt_execute', 'Com_select')",
+                      fetch='all', dictionary=True)
+    return {row['Variable_name']: int(row['Value']) for row in rows}
+
+
+def _run(db, calls: int, call) -> tuple:
+    before = _counters(db)
+    start = time.perf_counter()
+    for _ in range(calls):
+        call()
+    elapsed = time.perf_counter() - start
+    after = _counters(db)
+    return elapsed / calls, {key: after[key] - before[key] for key in after}
+
+
+def main(args) -> None:
+    # One connection, so the session counters cover every call
+    db = open_database(pool_size=1, on_connect=apply_migrations)
+    params = {name: (args.username,) if name == "check_credentials" else (args.event_id,) for name in READS}
+    params["event_holds"] = (args.event_id, int(time.time()))
+    print(f"{'statement':<20}{'plain':>12}{'prepared':>12}{'change':>9}")
+    for name in READS:
+        plain, plain_counts = _run(db, args.calls, lambda: db.execute(STATEMENTS[name], params[name], 'all', dictionary=True))
+        prepared, prepared_counts = _run(db, args.calls, lambda: db.execute_prepared(name, params[name], 'all'))
+        print(f"{name:<20}{plain * 1e6:>10.1f}us{prepared * 1e6:>10.1f}us{(prepared - plain) / plain:>+9.1%}")
+        if plain_counts:
+            print(f"{'':<20}plain {plain_counts}")
+            print(f"{'':<20}prepared {prepared_counts}")
+    print(db.statements.prepared_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--event-id", type=int, default=1)
+    parser.add_argument("--username", default="bench")
+    main(parser.parse_args())
@@ -0,0 +1,34 @@
+import os
+
+# "mysql", or "sqlite" for a single-file database with no server to run
+DB_BACKEND = os.environ.get("EVENTBITE_DB_BACKEND", "mysql")
+
+# Connection settings shared by everything that talks to MySQL.
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "admin",
+    "database": "EventDB",
+}
+
+SQLITE_PATH = os.environ.get("EVENTBITE_SQLITE_PATH", "eventbite.db")
+
+# Read replicas as "host[:port]" entries separated by commas, e.g.
+# EVENTBITE_DB_REPLICAS=10.0.0.5,10.0.0.6:3307. They use DB_CONFIG's
+# credentials and database. Empty means every query goes to the primary.
+DB_REPLICAS = [entry.strip() for entry in os.environ.get("EVENTBITE_DB_REPLICAS", "").split(",") if entry.strip()]
+# A replica further behind than this (seconds) is taken out of rotation
+REPLICA_MAX_LAG = float(os.environ.get("EVENTBITE_REPLICA_MAX_LAG", 5))
+REPLICA_CHECK_INTERVAL = float(os.environ.get("EVENTBITE_REPLICA_CHECK_INTERVAL", 5))
+
+# Shows this many days in the past are moved to the history tables nightly
+ARCHIVE_AFTER_DAYS = int(os.environ.get("EVENTBITE_ARCHIVE_AFTER_DAYS", 1))
+
+# Resized event images served by /image, kept under this many megabytes
+IMAGE_CACHE_DIR = os.environ.get("EVENTBITE_IMAGE_CACHE_DIR", "image_cache")
+IMAGE_CACHE_MAX_MB = float(os.environ.get("EVENTBITE_IMAGE_CACHE_MAX_MB", 256))
+
+# Port the API listens on, announced to clients with the server's address.
+# Give every server on the LAN its own EVENTBITE_SERVER_ID if they share a host.
+SERVER_PORT = int(os.environ.get("EVENTBITE_PORT", 5000))
+SERVER_ID = os.environ.get("EVENTBITE_SERVER_ID", "")
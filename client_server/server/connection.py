@@ -0,0 +1,149 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import mysql.connector
+from mysql.connector import Error
+
+from config import DB_BACKEND, DB_CONFIG, SQLITE_PATH
+from statements import PreparedStatements
+
+# What a failed statement raises, on either backend
+DB_ERRORS = (Error, sqlite3.Error)
+
+
+class ConnectionManager:
+    """A small pool of long-lived MySQL connections.
+
+    Connections are opened on first use and kept for the life of the
+    process. Each checkout pings the connection and reconnects if the
+    server dropped it; a connection that fails mid-transaction is thrown
+    away rather than returned to the pool. Named statements from
+    statements.py run through execute_prepared and are prepared once per
+    connection.
+    """
+
+    def __init__(self, config: Dict[str, Any] = None, pool_size: int = 1,
+                 on_connect: Optional[Callable[[Any], None]] = None):
+        self.config = dict(config or DB_CONFIG)
+        self.pool_size = pool_size
+        self.on_connect = on_connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        # Held while on_connect runs, so only one connection runs it at a time
+        self._on_connect_lock = threading.Lock()
+        self._first_connect = True
+        self.statements = PreparedStatements()
+        self.stats = {"connects": 0, "reconnects": 0, "transactions": 0, "errors": 0}
+
+    def _open(self):
+        return mysql.connector.connect(**self.config)
+
+    def connect(self):
+        """Open a new connection with the shared settings.
+
+        on_connect runs on the first connection, and again on the next one
+        if it failed.
+        """
+        conn = self._open()
+        with self._lock:
+            self.stats["connects"] += 1
+        if self.on_connect and self._first_connect:
+            with self._on_connect_lock:
+                if self._first_connect:
+                    try:
+                        self.on_connect(conn)
+                    except Exception:
+                        conn.close()
+                        raise
+                    self._first_connect = False
+        return conn
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Lifetime counters plus the current number of idle connections."""
+        with self._lock:
+            return dict(self.stats, idle=self._idle.qsize(), size=self.pool_size)
+
+    def _checkout(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self.connect()
+        if not conn.is_connected():
+            with self._lock:
+                self.stats["reconnects"] += 1
+            self.statements.forget(conn)
+            conn.reconnect(attempts=3, delay=0.5)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Yield a pooled connection; commit on success, roll back and re-raise on error."""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                with self._lock:
+                    self.stats["errors"] += 1
+                try:
+                    conn.rollback()
+                except DB_ERRORS:
+                    self.statements.forget(conn)
+                    conn.close()
+                    conn = None
+                raise
+            with self._lock:
+                self.stats["transactions"] += 1
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self, dictionary: bool = False):
+        """Yield a cursor; commit on success, roll back and re-raise on error."""
+        with self._connection() as conn:
+            cursor = conn.cursor(dictionary=dictionary)
+            try:
+                yield cursor
+            finally:
+                try:
+                    cursor.close()
+                except DB_ERRORS:
+                    pass
+
+    def execute(self, query: str, params: tuple = None, fetch: str = None, dictionary: bool = False) -> Any:
+        """Run one statement in its own transaction.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+            fetch: 'one' for single row, 'all' for all rows, None for the row count
+        """
+        with self.transaction(dictionary=dictionary) as cursor:
+            cursor.execute(query, params or ())
+            if fetch == 'one':
+                return cursor.fetchone()
+            elif fetch == 'all':
+                return cursor.fetchall()
+            return cursor.rowcount
+
+    def execute_prepared(self, name: str, params: tuple, fetch: str = None) -> Any:
+        """Like execute(dictionary=True) for the named statement in statements.STATEMENTS."""
+        with self._connection() as conn:
+            return self.statements.execute(conn, name, params, fetch)
+
+
+def open_database(pool_size: int = 1, on_connect: Optional[Callable[[Any], None]] = None) -> ConnectionManager:
+    """Connection manager for the configured backend (config.DB_BACKEND)."""
+    if DB_BACKEND == "sqlite":
+        from sqlite_backend import SQLiteConnectionManager
+        return SQLiteConnectionManager(SQLITE_PATH, pool_size=pool_size, on_connect=on_connect)
+    return ConnectionManager(DB_CONFIG, pool_size=pool_size, on_connect=on_connect)
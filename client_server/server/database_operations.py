@@ -1,46 +1,151 @@
 
 import json
-import random
+import threading
 import time
+import uuid
 from typing import List, Dict, Any, Optional, Tuple
-from mysql.connector import connect
-
-# Database connection
-conn = connect(
-    host="localhost",
-    user="root",
-    password="admin",
-    database="EventDB"
-)
-cursor = conn.cursor(dictionary=True)
-
-def execute_query(query: str, params: tuple = None, fetch: str = None) -> Any:
+from config import DB_BACKEND, DB_REPLICAS, REPLICA_CHECK_INTERVAL, REPLICA_MAX_LAG
+from connection import open_database
+from event_summary import rebuild_event_summary, roll_forward_event_summary
+from id_generator import SnowflakeGenerator, id_minus_ms
+import query_stats
+from replicas import ReplicaRouter
+from schema import apply_migrations
+from seat_holds import purge_expired_holds, release_seats
+from seatmap import decode_seat_ranges, parse_seat_list
+from sessions import hash_password, needs_rehash, verify_password
+from statements import STATEMENTS
+from write_batcher import WriteBatcher
+
+# Database connections, opened on first use; request threads share the pool
+db = open_database(pool_size=8, on_connect=apply_migrations)
+
+# Seat holds and booking inserts are group-committed on a connection of their own
+booking_writes = WriteBatcher(db.connect, statements=db.statements)
+ticket_ids = SnowflakeGenerator()
+# A ticket can get a lower ID than one already synced: servers' clocks differ
+# and a batch commits a little after its IDs were issued. Delta syncs re-send
+# tickets this much older than the client's newest one to cover that.
+TICKET_SYNC_OVERLAP_MS = 10 * 60 * 1000
+
+# Catalog reads can go to read replicas; None when there are none configured
+replicas = None
+if DB_REPLICAS and DB_BACKEND == "mysql":
+    replicas = ReplicaRouter(DB_REPLICAS, max_lag=REPLICA_MAX_LAG, check_interval=REPLICA_CHECK_INTERVAL)
+
+# Statement timing; None unless EVENTBITE_QUERY_STATS=1
+query_log = query_stats.QueryStats() if query_stats.ENABLED else None
+
+# Database time spent by the current request thread, for Server-Timing
+_request_db_time = threading.local()
+
+def reset_db_time() -> None:
+    _request_db_time.seconds = 0.0
+
+def get_db_time() -> float:
+    return getattr(_request_db_time, 'seconds', 0.0)
+
+def _run_query(query: str, params: tuple, fetch: str, replica: bool, sticky: Optional[str]) -> Any:
+    reader = replicas.reader(sticky) if replica and replicas else None
+    if reader is not None:
+        try:
+            return reader.execute(query, params, fetch, dictionary=True)
+        except Exception as e:
+            print(f"Replica read failed, using the primary: {e}")
+            replicas.failed(reader)
+    return db.execute(query, params, fetch, dictionary=True)
+
+def execute_query(query: str, params: tuple = None, fetch: str = None,
+                  replica: bool = False, sticky: str = None) -> Any:
     """Execute a query and return results.
     
     Args:
         query: SQL query string
         params: Query parameters
         fetch: 'one' for single row, 'all' for all rows, None for no results
+        replica: read-only query that may be served by a read replica
+        sticky: key (e.g. a username) whose reads stay on the primary shortly after its writes
     """
+    start = time.perf_counter()
     try:
-        cursor.execute(query, params or ())
-        if fetch == 'one':
-            return cursor.fetchone()
-        elif fetch == 'all':
-            return cursor.fetchall()
-        conn.commit()
-        return cursor.rowcount
+        result = _run_query(query, params, fetch, replica, sticky)
     except Exception as e:
         print(f"Database error: {e}")
-        conn.rollback()
         raise
+    _record_query(query, fetch, result, time.perf_counter() - start)
+    return result
+
+def execute_statement(name: str, params: tuple, fetch: str = None) -> Any:
+    """execute_query for a named statement from statements.py, prepared once per connection."""
+    start = time.perf_counter()
+    try:
+        result = db.execute_prepared(name, params, fetch)
+    except Exception as e:
+        print(f"Database error: {e}")
+        raise
+    _record_query(STATEMENTS[name], fetch, result, time.perf_counter() - start)
+    return result
+
+def _record_query(query: str, fetch: str, result: Any, elapsed: float) -> None:
+    _request_db_time.seconds = get_db_time() + elapsed
+    if query_log is not None:
+        if fetch == 'all':
+            rows = len(result)
+        elif fetch == 'one':
+            rows = int(result is not None)
+        else:
+            rows = result
+        query_log.record(query, elapsed, rows)
 
 def get_event_name(event_id: int) -> str:
-    query = "SELECT EventName FROM Events WHERE EventID = %s"
-    return execute_query(query, (event_id,), fetch='one')['EventName']
+    event = execute_statement("get_event_name", (event_id,), fetch='one')
+    if event is None:
+        # Past shows are moved to events_history by archive.py
+        event = execute_query("SELECT EventName FROM events_history WHERE EventID = %s", (event_id,), fetch='one')
+    return event['EventName']
+
+def list_events(event_type: str = None, include_shows: bool = False) -> List[Dict[str, Any]]:
+    """List upcoming events, optionally filtered by type.
+
+    Reads the event_summary table; include_shows adds each event's upcoming
+    shows, which needs the full Events scan.
+    """
+    if include_shows:
+        return _list_events_with_shows(event_type)
+    if event_type and event_type.lower() != "all":
+        query = """
+            SELECT * FROM event_summary
+            WHERE LOWER(type) = %s
+        """
+        rows = execute_query(query, (event_type.lower(),), fetch='all', replica=True) or []
+    else:
+        rows = execute_query("SELECT * FROM event_summary", fetch='all', replica=True) or []
 
-def list_events(event_type: str = None) -> List[Dict[str, Any]]:
-    """List all events, optionally filtered by type."""
+    # An event listed under several types is one card when not filtering
+    events_by_name = {}
+    for row in rows:
+        name = row['EventName']
+        event = events_by_name.get(name)
+        if event is None:
+            events_by_name[name] = {
+                'EventName': name,
+                'type': row['type'] or None,
+                'image': row['image'],
+                'description': row['description'],
+                'EarliestDate': row['EarliestDate'],
+                'ShowCount': row['ShowCount'],
+            }
+            continue
+        event['ShowCount'] += row['ShowCount']
+        if row['EarliestDate'] < event['EarliestDate']:
+            event.update(type=row['type'] or None, image=row['image'], description=row['description'],
+                         EarliestDate=row['EarliestDate'])
+
+    result = list(events_by_name.values())
+    result.sort(key=lambda e: (e['EarliestDate'], e['EventName']))
+    return result
+
+def _list_events_with_shows(event_type: str = None) -> List[Dict[str, Any]]:
     if event_type and event_type.lower() != "all":
         query = """
             SELECT E.*, V.VenueName 
@@ -49,7 +154,7 @@ def list_events(event_type: str = None) -> List[Dict[str, Any]]:
             WHERE E.Date >= CURDATE() AND LOWER(E.type) = %s
             ORDER BY E.EventName, E.Date, E.StartTime
         """
-        rows = execute_query(query, (event_type.lower(),), fetch='all') or []
+        rows = execute_query(query, (event_type.lower(),), fetch='all', replica=True) or []
     else:
         query = """
             SELECT E.*, V.VenueName 
@@ -58,7 +163,7 @@ def list_events(event_type: str = None) -> List[Dict[str, Any]]:
             WHERE E.Date >= CURDATE()
             ORDER BY E.EventName, E.Date, E.StartTime
         """
-        rows = execute_query(query, fetch='all') or []
+        rows = execute_query(query, fetch='all', replica=True) or []
     
     events_by_name = {}
     for row in rows:
@@ -91,14 +196,70 @@ def get_event_shows(event_name: str) -> List[Dict[str, Any]]:
         WHERE E.EventName = %s AND E.Date >= CURDATE()
         ORDER BY E.Date, E.StartTime
     """
-    return execute_query(query, (event_name,), fetch='all') or []
+    return execute_query(query, (event_name,), fetch='all', replica=True) or []
+
+def get_event_image(event_name: str) -> Optional[str]:
+    """Source URL of an event's image, from its summary, shows or archived shows."""
+    for query in ("SELECT image FROM event_summary WHERE EventName = %s AND image IS NOT NULL LIMIT 1",
+                  "SELECT image FROM Events WHERE EventName = %s AND image IS NOT NULL LIMIT 1",
+                  "SELECT image FROM events_history WHERE EventName = %s AND image IS NOT NULL LIMIT 1"):
+        row = execute_query(query, (event_name,), fetch='one', replica=True)
+        if row and row['image']:
+            return row['image']
+    return None
 
 def get_event_types() -> List[str]:
     """Get all distinct event types."""
-    query = "SELECT DISTINCT type FROM Events WHERE Date >= CURDATE() AND type IS NOT NULL"
-    results = execute_query(query, fetch='all') or []
+    query = "SELECT DISTINCT type FROM event_summary WHERE type <> ''"
+    results = execute_query(query, fetch='all', replica=True) or []
     return [row['type'] for row in results]
 
+# Changes re-sent from before a client's `since`, in case writes committed out of Seq order
+CATALOG_OVERLAP = 50
+
+def get_catalog_changes(since: int = 0) -> Dict[str, Any]:
+    """Summary rows changed after sequence number `since`, for clients' catalog snapshots.
+
+    Returns the whole summary ('full': True) when `since` is 0 or no longer
+    covered by catalog_changes. Otherwise 'events' holds the current rows of
+    every event changed since then and 'removed' the names with no
+    upcoming shows left. Reads the primary so 'seq' never runs ahead of the rows.
+    """
+    bounds = execute_query("SELECT MIN(Seq) AS first, MAX(Seq) AS last FROM catalog_changes", fetch='one')
+    last = bounds['last'] or 0
+    if since <= 0 or bounds['first'] is None or since < bounds['first'] - 1 or since > last:
+        rows = execute_query("SELECT * FROM event_summary", fetch='all') or []
+        return {'seq': last, 'full': True, 'events': rows, 'removed': []}
+
+    query = "SELECT DISTINCT Name FROM catalog_changes WHERE Kind = 'event' AND Seq > %s AND Seq <= %s"
+    names = [row['Name'] for row in execute_query(query, (since - CATALOG_OVERLAP, last), fetch='all') or []]
+    rows = []
+    if names:
+        placeholders = ", ".join(["%s"] * len(names))
+        rows = execute_query(f"SELECT * FROM event_summary WHERE EventName IN ({placeholders})",
+                             tuple(names), fetch='all') or []
+    present = {row['EventName'] for row in rows}
+    return {'seq': last, 'full': False, 'events': rows, 'removed': [name for name in names if name not in present]}
+
+def prune_catalog_changes(keep: int = 10000) -> int:
+    """Drop all but the newest `keep` catalog changes; older clients fall back to a full sync."""
+    last = execute_query("SELECT MAX(Seq) AS last FROM catalog_changes", fetch='one')['last']
+    if not last or last <= keep:
+        return 0
+    return execute_query("DELETE FROM catalog_changes WHERE Seq <= %s", (last - keep,))
+
+def refresh_event_summary(rebuild: bool = False) -> int:
+    """Drop past shows from event_summary, or rebuild it from Events.
+
+    Returns:
+        int: number of events refreshed (0 for a rebuild)
+    """
+    with db.transaction() as cursor:
+        if rebuild:
+            rebuild_event_summary(cursor)
+            return 0
+        return roll_forward_event_summary(cursor)
+
 def register_user(username: str, password: str, name: str) -> bool:
     """Register a new user.
     
@@ -121,26 +282,27 @@ def register_user(username: str, password: str, name: str) -> bool:
         VALUES (%s, %s, %s)
     """
     try:
-        execute_query(insert_query, (username, password, name))
+        execute_query(insert_query, (username, hash_password(password), name))
         return True
     except Exception as e:
         print(f"Error registering user: {e}")
         return False
 
 def check_credentials(username: str, password: str) -> bool:
-    """Check if the provided credentials are valid."""
-    query = "SELECT 1 FROM Users WHERE Username = %s AND pwd = %s LIMIT 1"
-    return bool(execute_query(query, (username, password), fetch='one'))
+    """Check if the provided credentials are valid.
+
+    Plaintext passwords left from before hashing are upgraded on a successful login.
+    """
+    user = execute_statement("check_credentials", (username,), fetch='one')
+    if not user or not user['pwd'] or not verify_password(password, user['pwd']):
+        return False
+    if needs_rehash(user['pwd']):
+        execute_query("UPDATE Users SET pwd = %s WHERE Username = %s", (hash_password(password), username))
+    return True
 
 def get_venue_seats(event_id: int) -> Tuple[List[str], List[str], List[str]]:
     """Get all, unavailable, and booked seats for an event."""
-    query = """
-        SELECT V.RowsColumns, V.NoSeats 
-        FROM Events E 
-        JOIN Venues V ON E.VenueID = V.VenueID 
-        WHERE E.EventID = %s
-    """
-    venue = execute_query(query, (event_id,), fetch='one')
+    venue = execute_statement("venue_layout", (event_id,), fetch='one')
     
     if not venue:
         return [], [], []
@@ -148,88 +310,97 @@ def get_venue_seats(event_id: int) -> Tuple[List[str], List[str], List[str]]:
     rows, cols = map(int, venue['RowsColumns'].split('x'))
     all_seats = [f"{chr(65 + r)}{c}" for r in range(rows) for c in range(1, cols + 1)]
     
-    unavailable = venue['NoSeats'].replace(" ", "").split(',') if venue['NoSeats'] else []
+    unavailable = decode_seat_ranges(venue['NoSeats'])
     
     booked = []
-    query = "SELECT Seats FROM tickets WHERE EventID = %s"
-    results = execute_query(query, (event_id,), fetch='all') or []
+    results = execute_statement("event_tickets", (event_id,), fetch='all') or []
     for row in results:
-        seats = row['Seats']
-        if seats:
-            try:
-                booked.extend(json.loads(seats))
-            except (json.JSONDecodeError, TypeError):
-                booked.extend([s.strip() for s in str(seats).split(',')])
+        booked.extend(parse_seat_list(row['Seats']))
     
-    locked = []
-    query = "SELECT seats FROM lockedseats WHERE EventID = %s"
-    results = execute_query(query, (event_id,), fetch='all') or []
-    
-    for row in results:
-        seats = row['seats']
-        if seats:
-            try:
-                locked.extend(json.loads(seats))
-            except (json.JSONDecodeError, TypeError):
-                locked.extend([s.strip() for s in str(seats).split(',')])
-
-    for seat in locked:
-        booked.append(seat)
-    print(list(set(booked)))
+    # Held and booked seats, live holds only
+    results = execute_statement("event_holds", (event_id, int(time.time())), fetch='all') or []
+    booked.extend(row['Seat'] for row in results)
     return all_seats, unavailable, list(set(booked))
 
-def lock_seats(selected_seats: List[str], event_id: int) -> bool:
-    """Lock selected seats for an event."""
+def lock_seats(selected_seats: List[str], event_id: int, hold_id: Optional[str] = None) -> Dict[str, Any]:
+    """Hold all of the selected seats for seat_holds.HOLD_SECONDS, or none of them.
+
+    Passing the `hold_id` of an earlier hold extends it, or adds seats to it.
+
+    Returns:
+        dict: held (bool), hold_id to book or release the seats with, and the
+        seats that someone else already holds or booked
+    """
+    hold_id = hold_id or uuid.uuid4().hex
     try:
-        query = """
-            INSERT INTO lockedseats (EventID, Seats) 
-            VALUES (%s, %s)
-        """
-        execute_query(query, (event_id, json.dumps(selected_seats)))
-        release_locked_seats(event_id, json.dumps(selected_seats))
-        return True
+        conflicts = booking_writes.submit(None, None, event_id, selected_seats, holder=hold_id)
     except Exception as e:
         print(f"Error locking seats: {e}")
-        return False
+        return {"held": False, "hold_id": None, "conflicts": []}
+    if conflicts:
+        print(f"Seats already taken: {conflicts}")
+        return {"held": False, "hold_id": None, "conflicts": conflicts}
+    return {"held": True, "hold_id": hold_id, "conflicts": []}
 
-def create_ticket(event_id: int, username: str, seats: List[str]) -> Optional[int]:
-    """Create a new ticket and return the ticket ID."""
-    ticket_id = random.randint(100000, 999999)
-    query = """
-        INSERT INTO tickets (TicketID, EventID, Seats, Username) 
-        VALUES (%s, %s, %s, %s)
+def create_ticket(event_id: int, username: str, seats: List[str], hold_id: Optional[str] = None) -> Optional[int]:
+    """Create a new ticket and return the ticket ID.
+
+    Seats held under `hold_id` are booked; any others must be free.
     """
+    ticket_id = ticket_ids.next_id()
     try:
-        execute_query(query, (ticket_id, event_id, json.dumps(seats), username))
+        params = (ticket_id, event_id, json.dumps(seats), username)
+        conflicts = booking_writes.submit(STATEMENTS["create_ticket"], params, event_id, seats,
+                                          holder=hold_id or username, ticket_id=ticket_id)
+        if conflicts:
+            print(f"Seats already booked: {conflicts}")
+            return None
+        if replicas:
+            replicas.wrote(username)
         return ticket_id
     except Exception as e:
         print(f"Error creating ticket: {e}")
         return None
 
-def get_user_tickets(username: str) -> List[Dict[str, Any]]:
-    """Get all tickets for a user."""
+def get_user_tickets(username: str, since: int = 0) -> List[Dict[str, Any]]:
+    """Get a user's tickets, live ones first, then archived ones.
+
+    Ticket IDs grow over time, so `since` (the highest TicketID a client
+    already has) limits the result to tickets created after it, less
+    TICKET_SYNC_OVERLAP_MS for tickets that got their IDs out of order;
+    the client merges the overlap by TicketID.
+    """
+    since = id_minus_ms(since, TICKET_SYNC_OVERLAP_MS) if since else 0
     query = """
-        SELECT t.*, e.EventName, e.Date, e.StartTime, v.VenueName
+        SELECT t.*, e.EventName, e.Date, e.StartTime, v.VenueName, 0 AS Archived
         FROM tickets t
         JOIN Events e ON t.EventID = e.EventID
         JOIN Venues v ON e.VenueID = v.VenueID
-        WHERE t.Username = %s
-        ORDER BY e.Date DESC, e.StartTime DESC
+        WHERE t.Username = %s AND t.TicketID > %s
+        UNION ALL
+        SELECT t.*, e.EventName, e.Date, e.StartTime, v.VenueName, 1 AS Archived
+        FROM tickets_history t
+        JOIN events_history e ON t.EventID = e.EventID
+        JOIN Venues v ON e.VenueID = v.VenueID
+        WHERE t.Username = %s AND t.TicketID > %s
+        ORDER BY Archived, Date DESC, StartTime DESC
     """
-    return execute_query(query, (username,), fetch='all') or []
+    params = (username, since, username, since)
+    return execute_query(query, params, fetch='all', replica=True, sticky=username) or []
 
-def release_locked_seats(event_id: int, seats: str) -> None:
-    """Release locked seats after a delay."""
-    import threading
-    
-    def _release():
-        time.sleep(300)  # 10 second delay
-        query = "DELETE FROM lockedseats WHERE EventID = %s AND Seats = %s"
-        execute_query(query, (event_id, seats))
-    
-    thread = threading.Thread(target=_release)
-    thread.daemon = True
-    thread.start()
+def release_locked_seats(event_id: int, seats: List[str], hold_id: str) -> int:
+    """Give up the seats held under `hold_id` before the hold expires.
+
+    Returns:
+        int: number of seats released
+    """
+    with db.transaction() as cursor:
+        return release_seats(cursor, event_id, seats, hold_id)
+
+def purge_seat_holds() -> int:
+    """Delete expired seat holds."""
+    with db.transaction() as cursor:
+        return purge_expired_holds(cursor)
 
 
 # print(list_events())
\ No newline at end of file
@@ -1,7 +1,21 @@
 import flet as ft
 import mysql.connector
-from mysql.connector import Error
+import argparse
+import csv
 import datetime
+import json
+import sys
+import threading
+import time
+from archive import archive_past_shows
+from config import ARCHIVE_AFTER_DAYS, DB_BACKEND, DB_CONFIG
+from connection import DB_ERRORS, open_database
+from event_summary import record_catalog_changes, refresh_event_summary
+from schema import apply_migrations
+from seatmap import check_grid_size, decode_seat_ranges, encode_seat_ranges, parse_range_spec, seat_label
+
+# One long-lived connection for every manager action
+db = open_database(on_connect=apply_migrations)
 
 
 def create_database(host, user, password, db_name):
@@ -18,7 +32,7 @@ def create_database(host, user, password, db_name):
             cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
             print(f"Database '{db_name}' created successfully (or already exists).")
 
-    except Error as e:
+    except DB_ERRORS as e:
         print(f"Error: {e}")
     
     finally:
@@ -26,65 +40,242 @@ def create_database(host, user, password, db_name):
             connection.close()
 
 def add_venue(venue_name, venue_id, rowscolumn, noseats):
+    noseats_json = encode_seat_ranges(noseats)
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="admin",
-            database="eventdb"
-        )
-
-        noseats_json = ""
-        for i in noseats:
-            noseats_json += i + ","
-        if connection.is_connected():
-            cursor = connection.cursor()
+        with db.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO venues (VenueName, VenueID, RowsColumns, NoSeats) 
                 VALUES (%s, %s, %s, %s)
             """, (venue_name, venue_id, rowscolumn, noseats_json))
-            connection.commit()
-    
-    except Error as e:
+            record_catalog_changes(cursor, "venue", [venue_id])
+    except DB_ERRORS as e:
         print(f"Error: {e}")
-    finally:
-        if connection.is_connected():
-            connection.close()
 
 def add_event(event_name, event_id, event_date, event_start_time, event_end_time, event_description, venue_id, event_image, event_type):
-    print(venue_id)
-    connection = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="admin",   # Replace with your actual password
-    database="eventdb")
-    cursor = connection.cursor()
-    cursor.execute("SELECT venueid FROM venues where venueid = %s", (venue_id,))
-    venues = cursor.fetchone()
-    
-    
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="admin",
-            database="eventdb"
-        )
-
-        if connection.is_connected():
-            cursor = connection.cursor()
+        with db.transaction() as cursor:
+            cursor.execute("SELECT VenueID FROM venues WHERE VenueID = %s", (venue_id,))
+            if not cursor.fetchone():
+                print(f"Error: unknown venue {venue_id}")
+                return
             cursor.execute("""
                 INSERT INTO events (EventName, EventID, Date, StartTime, EndTime, Description, VenueID, image, type) 
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, (event_name, event_id, event_date, event_start_time, event_end_time, event_description, venue_id, event_image, event_type))
-            connection.commit()
-            # print("Event added successfully.")
-    except Error as e:
+            refresh_event_summary(cursor, [event_name])
+    except DB_ERRORS as e:
         print(f"Error: {e}")
-    finally:
-        if connection.is_connected():
-            connection.close()
 
+def save_layout_template(name, rowscolumn, noseats):
+    """Save (or overwrite) a named seat layout for reuse across venues."""
+    db.execute(
+        "REPLACE INTO seat_templates (TemplateName, RowsColumns, NoSeats) VALUES (%s, %s, %s)",
+        (name, rowscolumn, encode_seat_ranges(noseats))
+    )
+
+def list_layout_templates():
+    return [name for (name,) in db.execute("SELECT TemplateName FROM seat_templates ORDER BY TemplateName", fetch='all')]
+
+def load_layout_template(name):
+    """Return (rows, cols, unavailable seats) for a saved layout, or None."""
+    template = db.execute("SELECT RowsColumns, NoSeats FROM seat_templates WHERE TemplateName = %s", (name,), fetch='one')
+    if not template:
+        return None
+    rows, cols = map(int, template[0].split("x"))
+    return rows, cols, set(decode_seat_ranges(template[1]))
+
+def search_venues(prefix, limit=20):
+    """Return up to `limit` (VenueID, VenueName) pairs whose name starts with `prefix`."""
+    pattern = prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+    return db.execute(
+        "SELECT VenueID, VenueName FROM venues WHERE VenueName LIKE %s ESCAPE '!' ORDER BY VenueName LIMIT %s",
+        (pattern, limit), fetch='all'
+    )
+
+def expand_recurrence(start_date, end_date, frequency, weekdays=None, exceptions=()):
+    """List the dates of a recurring run, both ends inclusive.
+
+    Args:
+        frequency: 'daily' or 'weekly'
+        weekdays: for weekly runs, weekday numbers (Monday is 0); defaults to start_date's weekday
+        exceptions: dates to leave out
+    """
+    if isinstance(start_date, datetime.datetime):
+        start_date = start_date.date()
+    if isinstance(end_date, datetime.datetime):
+        end_date = end_date.date()
+    if frequency == "weekly":
+        weekdays = set(weekdays) if weekdays else {start_date.weekday()}
+    elif frequency != "daily":
+        raise ValueError(f"Unknown frequency {frequency}")
+    skip = {d.date() if isinstance(d, datetime.datetime) else d for d in exceptions}
+
+    dates = []
+    day = start_date
+    while day <= end_date:
+        if day not in skip and (frequency == "daily" or day.weekday() in weekdays):
+            dates.append(day)
+        day += datetime.timedelta(days=1)
+    return dates
+
+def add_event_run(event_name, dates, event_start_time, event_end_time, event_description, venue_ids, event_image, event_type):
+    """Add a show for every date at every venue in one transaction.
+
+    Event IDs continue from the current maximum, read FOR UPDATE so a
+    concurrent run waits for this one to commit instead of reusing IDs.
+
+    Returns:
+        int: number of shows added
+    """
+    venue_ids = [str(venue_id) for venue_id in venue_ids]
+    with db.transaction() as cursor:
+        placeholders = ", ".join(["%s"] * len(venue_ids))
+        cursor.execute(f"SELECT VenueID FROM venues WHERE VenueID IN ({placeholders})", venue_ids)
+        unknown = set(venue_ids) - {str(venue_id) for (venue_id,) in cursor.fetchall()}
+        if unknown:
+            raise ValueError(f"Unknown venues: {', '.join(sorted(unknown))}")
+
+        cursor.execute("SELECT COALESCE(MAX(EventID), 0) FROM events FOR UPDATE")
+        next_id = cursor.fetchone()[0] + 1
+        rows = []
+        for day in dates:
+            for venue_id in venue_ids:
+                rows.append((event_name, next_id, day, event_start_time, event_end_time, event_description, venue_id, event_image, event_type))
+                next_id += 1
+        cursor.executemany("""
+            INSERT INTO events (EventName, EventID, Date, StartTime, EndTime, Description, VenueID, image, type) 
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+        refresh_event_summary(cursor, [event_name])
+    return len(rows)
+
+IMPORT_COLUMNS = {
+    "venues": ["VenueName", "VenueID", "RowsColumns", "NoSeats"],
+    "events": ["EventName", "EventID", "Date", "StartTime", "EndTime", "Description", "VenueID", "image", "type"],
+}
+
+def _read_rows(path):
+    """Yield (line, row) pairs from a CSV, JSON Lines or JSON array file.
+
+    A JSON Lines line that doesn't parse is yielded as a ValueError in place
+    of its row, so the import reports it and carries on.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield f"line {reader.line_num}", row
+    elif path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = ValueError(f"invalid JSON: {e}")
+                yield f"line {number}", row
+    else:
+        # A plain JSON array has to be read whole; use .jsonl for huge files
+        with open(path, encoding="utf-8") as f:
+            for number, row in enumerate(json.load(f), 1):
+                yield f"item {number}", row
+
+def _validate_row(kind, row, venue_ids):
+    """Return the row as an INSERT parameter tuple; raises ValueError if it is invalid."""
+    values = []
+    for column in IMPORT_COLUMNS[kind]:
+        value = row.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, "") and column not in ("NoSeats", "Description", "image", "type"):
+            raise ValueError(f"missing {column}")
+        values.append(value)
+    fields = dict(zip(IMPORT_COLUMNS[kind], values))
+    if kind == "venues":
+        rows, cols = (int(n) for n in fields["RowsColumns"].lower().split("x"))
+        check_grid_size(rows, cols)
+        if isinstance(fields["NoSeats"], list):
+            values[3] = encode_seat_ranges(fields["NoSeats"])
+    else:
+        if str(fields["VenueID"]) not in venue_ids:
+            raise ValueError(f"unknown venue {fields['VenueID']}")
+        datetime.date.fromisoformat(str(fields["Date"]))
+        for column in ("StartTime", "EndTime"):
+            datetime.time.fromisoformat(str(fields[column]))
+    return tuple(values)
+
+def bulk_import(path, kind, chunk_size=500):
+    """Stream venues or events from a file into the database.
+
+    Rows are validated as they are read (events against the set of known
+    venues, loaded once up front) and inserted with executemany, one
+    transaction per chunk. A chunk that fails is retried row by row so the
+    error is reported against the row that caused it.
+
+    Returns:
+        dict: row counts, rows per second and a list of (row, error) pairs
+    """
+    insert = "INSERT INTO {} ({}) VALUES ({})".format(
+        kind, ", ".join(IMPORT_COLUMNS[kind]), ", ".join(["%s"] * len(IMPORT_COLUMNS[kind]))
+    )
+    venue_ids = {str(venue_id) for (venue_id,) in db.execute("SELECT VenueID FROM venues", fetch='all')}
+
+    report = {"rows": 0, "inserted": 0, "errors": []}
+    started = time.perf_counter()
+    chunk = []
+
+    def flush():
+        # Imported rows reach the homepage summary and the catalog feed with their chunk
+        names = [values[0] for _, values in chunk] if kind == "events" else []
+
+        def record_changes(cursor):
+            if kind == "events":
+                refresh_event_summary(cursor, names)
+            else:
+                record_catalog_changes(cursor, "venue", [values[1] for _, values in chunk])
+
+        try:
+            with db.transaction() as cursor:
+                cursor.executemany(insert, [values for _, values in chunk])
+                record_changes(cursor)
+            report["inserted"] += len(chunk)
+        except DB_ERRORS:
+            for where, values in chunk:
+                try:
+                    db.execute(insert, values)
+                    report["inserted"] += 1
+                except DB_ERRORS as e:
+                    report["errors"].append((where, str(e)))
+            with db.transaction() as cursor:
+                record_changes(cursor)
+        chunk.clear()
+
+    for where, row in _read_rows(path):
+        report["rows"] += 1
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            values = _validate_row(kind, row, venue_ids)
+        except (ValueError, TypeError, AttributeError) as e:
+            report["errors"].append((where, str(e)))
+            continue
+        if kind == "venues":
+            venue_ids.add(str(values[1]))
+        chunk.append((where, values))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows"] / elapsed, 1) if elapsed else 0
+    return report
+
+
+# Drawing a checkbox per seat gets slow past this; bigger halls are edited by range
+GRID_RENDER_LIMIT = 1500
 
 def create_seating_view(page):
     rows_input = ft.TextField(label="Rows", width=120, keyboard_type=ft.KeyboardType.NUMBER)
@@ -92,43 +283,117 @@ def create_seating_view(page):
     mode = ft.Text(value="Mode: Add", size=16, weight="bold")
     grid_container = ft.Column(expand=True, scroll=ft.ScrollMode.AUTO)
     seat_controls = {}  
+    selected = set()
     feedback_text = ft.Text()
     container_style = dict(width=30, height=30, padding=0, margin=0)
+    range_input = ft.TextField(label="Range", hint_text="B, #3, A1:C5", width=200)
+    template_name = ft.TextField(label="Template", width=200)
+    template_dropdown = ft.Dropdown(label="Load template", width=200,
+                                    options=[ft.dropdown.Option(name) for name in list_layout_templates()])
 
-    def generate_grid(e):
+    def grid_size():
         try:
-            rows = int(rows_input.value)
-            cols = int(columns_input.value)
-            if rows <= 0 or cols <= 0:
-                raise ValueError("Rows and columns must be positive numbers")
-            grid_container.controls = []
-            seat_controls.clear()
-
-        
-            header_row = ft.Row([
-                ft.Container(width=24)
-            ] + [
-                ft.Text(str(col+1), size=12, weight="bold", width=30, text_align=ft.TextAlign.CENTER)
-                for col in range(cols)
-            ], spacing=2)
-            grid_container.controls.append(header_row)
-
-            # Grid rows
-            for row in range(rows):
-                row_letter = chr(65 + row)
-                row_controls = [ft.Text(row_letter, size=12, weight="bold", width=24, text_align=ft.TextAlign.CENTER)]
-                for col in range(cols):
-                    seat_label = f"{row_letter}{col+1}"
-                    checkbox = ft.Checkbox(value=False, data=seat_label, active_color=(ft.Colors.ON_SURFACE_VARIANT if mode.value == "Mode: Add" else ft.Colors.BLACK))
-                    seat_controls[seat_label] = checkbox
-                    control = ft.Container(content=checkbox, **container_style)
-                    row_controls.append(control)
-                grid_container.controls.append(ft.Row(row_controls, spacing=2))
+            rows, cols = int(rows_input.value), int(columns_input.value)
+        except (TypeError, ValueError):
+            raise ValueError("Rows and columns must be whole numbers")
+        check_grid_size(rows, cols)
+        return rows, cols
+
+    def unavailable_seats():
+        rows, cols = grid_size()
+        if mode.value == "Mode: Remove":
+            return set(selected)
+        return {seat_label(r, c) for r in range(rows) for c in range(1, cols + 1)} - selected
+
+    def show_message(message):
+        page.snack_bar = ft.SnackBar(ft.Text(message))
+        page.snack_bar.open = True
+        page.update()
+
+    def on_seat_change(e):
+        if e.control.value:
+            selected.add(e.control.data)
+        else:
+            selected.discard(e.control.data)
+
+    def render_grid():
+        rows, cols = grid_size()
+        grid_container.controls = []
+        seat_controls.clear()
+        if rows * cols > GRID_RENDER_LIMIT:
+            feedback_text.value = f"{rows * cols} seats, {len(selected)} selected: {encode_seat_ranges(selected) or 'none'}"
             page.update()
+            return
+        feedback_text.value = ""
+
+        header_row = ft.Row([
+            ft.Container(width=24)
+        ] + [
+            ft.Text(str(col+1), size=12, weight="bold", width=30, text_align=ft.TextAlign.CENTER)
+            for col in range(cols)
+        ], spacing=2)
+        grid_container.controls.append(header_row)
+
+        # Grid rows
+        for row in range(rows):
+            row_letter = chr(65 + row)
+            row_controls = [ft.Text(row_letter, size=12, weight="bold", width=24, text_align=ft.TextAlign.CENTER)]
+            for col in range(cols):
+                seat_label_text = f"{row_letter}{col+1}"
+                checkbox = ft.Checkbox(value=seat_label_text in selected, data=seat_label_text, on_change=on_seat_change,
+                                       active_color=(ft.Colors.ON_SURFACE_VARIANT if mode.value == "Mode: Add" else ft.Colors.BLACK))
+                seat_controls[seat_label_text] = checkbox
+                control = ft.Container(content=checkbox, **container_style)
+                row_controls.append(control)
+            grid_container.controls.append(ft.Row(row_controls, spacing=2))
+        page.update()
+
+    def generate_grid(e):
+        try:
+            selected.clear()
+            render_grid()
+        except ValueError as e:
+            show_message(str(e))
+
+    def edit_range(select):
+        try:
+            rows, cols = grid_size()
+            seats = parse_range_spec(range_input.value or "", rows, cols)
         except ValueError as e:
-            page.snack_bar = ft.SnackBar(ft.Text(str(e)))
-            page.snack_bar.open = True
+            show_message(f"Invalid range: {e}")
+            return
+        if select:
+            selected.update(seats)
+        else:
+            selected.difference_update(seats)
+        if seat_controls and all(label in seat_controls for label in seats):
+            for label in seats:
+                seat_controls[label].value = select
             page.update()
+        else:
+            # No grid yet, or it was drawn for a different size
+            render_grid()
+
+    def save_template(e):
+        try:
+            rows, cols = grid_size()
+            save_layout_template(template_name.value, f"{rows}x{cols}", unavailable_seats())
+        except (ValueError, *DB_ERRORS) as e:
+            show_message(f"Could not save template: {e}")
+            return
+        template_dropdown.options = [ft.dropdown.Option(name) for name in list_layout_templates()]
+        show_message(f"Saved template {template_name.value}")
+
+    def load_template(e):
+        template = load_layout_template(template_dropdown.value)
+        if not template:
+            return
+        rows, cols, unavailable = template
+        rows_input.value, columns_input.value = str(rows), str(cols)
+        mode.value = "Mode: Remove"
+        selected.clear()
+        selected.update(unavailable)
+        render_grid()
 
     def toggle_mode(e):
         if mode.value == "Mode: Add":
@@ -138,20 +403,16 @@ def create_seating_view(page):
         mode.update()
 
     def submit(e):
-        checkboxes = []
-        for seat_label, checkbox in seat_controls.items():
-            if mode.value == "Mode: Add" and not checkbox.value:
-                checkboxes.append(seat_label)
-            elif mode.value == "Mode: Remove" and checkbox.value:
-                checkboxes.append(seat_label)
-        result_text = "Selected seats: " + ", ".join(checkboxes) if checkboxes else "No seats selected"
+        try:
+            unavailable = unavailable_seats()
+        except ValueError as e:
+            show_message(str(e))
+            return
         venue_id = page.session.get("venue_id")
         venue_name = page.session.get("venue_name")
         rowscolumn = f"{rows_input.value}x{columns_input.value}"
-        add_venue(venue_name, venue_id, rowscolumn, checkboxes)
-        page.snack_bar = ft.SnackBar(ft.Text(result_text))
-        page.snack_bar.open = True
-        page.update()
+        add_venue(venue_name, venue_id, rowscolumn, unavailable)
+        show_message(f"Saved {venue_name} with {len(unavailable)} unavailable seats")
 
     generate_button = ft.OutlinedButton(
         "Generate Grid",
@@ -168,6 +429,7 @@ def create_seating_view(page):
         on_click=submit,
         icon=ft.Icons.CHECK_CIRCLE
     )
+    template_dropdown.on_change = load_template
 
     return ft.View(
         "/seating",
@@ -187,7 +449,7 @@ def create_seating_view(page):
                 content=ft.Column(
                     [
                         ft.Row(
-                            [rows_input, columns_input, generate_button],
+                            [rows_input, columns_input, generate_button, template_dropdown],
                             alignment=ft.MainAxisAlignment.CENTER,
                             spacing=20
                         ),
@@ -196,6 +458,17 @@ def create_seating_view(page):
                             alignment=ft.MainAxisAlignment.CENTER,
                             spacing=20
                         ),
+                        ft.Row(
+                            [
+                                range_input,
+                                ft.OutlinedButton("Select", on_click=lambda _: edit_range(True), icon=ft.Icons.SELECT_ALL),
+                                ft.OutlinedButton("Clear", on_click=lambda _: edit_range(False), icon=ft.Icons.DESELECT),
+                                template_name,
+                                ft.OutlinedButton("Save Template", on_click=save_template, icon=ft.Icons.SAVE),
+                            ],
+                            alignment=ft.MainAxisAlignment.CENTER,
+                            spacing=20
+                        ),
                         ft.Divider(),
                         grid_container,
                         ft.Row([feedback_text], alignment=ft.MainAxisAlignment.CENTER)
@@ -249,15 +522,31 @@ def create_home_view(page):
         ]
     )
 
+VENUE_SEARCH_LIMIT = 20
+VENUE_SEARCH_DELAY = 0.25  # seconds of typing pause before querying
+_venue_search_cache = {}
+
+def _cached_venue_search(prefix):
+    """search_venues with a per-prefix cache.
+
+    A shorter prefix that returned fewer than the limit already holds every
+    match for a longer one, so those are filtered locally.
+    """
+    key = prefix.lower()
+    if key in _venue_search_cache:
+        return _venue_search_cache[key]
+    for length in range(len(key) - 1, -1, -1):
+        shorter = _venue_search_cache.get(key[:length])
+        if shorter is not None and len(shorter) < VENUE_SEARCH_LIMIT:
+            venues = [v for v in shorter if v[1].lower().startswith(key)]
+            break
+    else:
+        venues = search_venues(prefix, VENUE_SEARCH_LIMIT)
+    _venue_search_cache[key] = venues
+    return venues
+
 def create_event_view(page):
-    connection = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="admin",   # Replace with your actual password
-    database="eventdb")
-    cursor = connection.cursor()
-    cursor.execute("SELECT * FROM venues")
-    venues = cursor.fetchall()
+    _venue_search_cache.clear()
     event_name = ft.TextField(hint_text="Name of Event")
     event_id = ft.TextField(hint_text="Event ID")
     event_date = ft.DatePicker(
@@ -278,10 +567,56 @@ def create_event_view(page):
 
     event_image = ft.TextField(hint_text="Image url of the banner")
     event_type = ft.TextField(hint_text="Event Type")
-    venue_dropdown = ft.Dropdown(
-        label="Select Venue",
-        options=[ft.dropdown.Option(venue[1] + ', ' + venue[0]) for venue in venues]
+    repeat = ft.Dropdown(
+        label="Repeat", width=160, value="none",
+        options=[ft.dropdown.Option("none", "Once"), ft.dropdown.Option("daily", "Daily"), ft.dropdown.Option("weekly", "Weekly")]
     )
+    run_end_date = ft.DatePicker(
+        first_date=datetime.datetime.today(),
+        last_date=datetime.datetime.today() + datetime.timedelta(days=365)
+    )
+    run_exceptions = ft.TextField(hint_text="Skip dates (YYYY-MM-DD, comma separated)")
+    extra_venues = ft.TextField(hint_text="Also at venue IDs (comma separated)")
+
+    def show_message(message):
+        page.snack_bar = ft.SnackBar(ft.Text(message))
+        page.snack_bar.open = True
+        page.update()
+
+    def create_event(e):
+        venue_id = venue_dropdown.value.split(",")[0]
+        if repeat.value == "none":
+            add_event(event_name.value, event_id.value, event_date.value, event_start_time.value, event_end_time.value, event_description.value, venue_id, event_image.value, event_type.value)
+            return
+        try:
+            exceptions = [datetime.date.fromisoformat(d.strip()) for d in (run_exceptions.value or "").split(",") if d.strip()]
+            venue_ids = [venue_id] + [v.strip() for v in (extra_venues.value or "").split(",") if v.strip()]
+            dates = expand_recurrence(event_date.value, run_end_date.value, repeat.value, exceptions=exceptions)
+            count = add_event_run(event_name.value, dates, event_start_time.value, event_end_time.value, event_description.value, venue_ids, event_image.value, event_type.value)
+        except (ValueError, TypeError, AttributeError, *DB_ERRORS) as ex:
+            show_message(f"Could not create run: {ex}")
+            return
+        show_message(f"Added {count} shows")
+    venue_dropdown = ft.Dropdown(label="Select Venue")
+    search_timer = None
+
+    def show_venues(prefix):
+        venue_dropdown.options = [
+            ft.dropdown.Option(f"{venue_id}, {venue_name}") for venue_id, venue_name in _cached_venue_search(prefix)
+        ]
+        page.update()
+
+    def on_venue_search(e):
+        nonlocal search_timer
+        if search_timer:
+            search_timer.cancel()
+        search_timer = threading.Timer(VENUE_SEARCH_DELAY, show_venues, args=(e.control.value or "",))
+        search_timer.start()
+
+    venue_search = ft.TextField(hint_text="Search venues", prefix_icon=ft.Icons.SEARCH, on_change=on_venue_search)
+    venue_dropdown.options = [
+        ft.dropdown.Option(f"{venue_id}, {venue_name}") for venue_id, venue_name in _cached_venue_search("")
+    ]
     controls = [
         event_name,
         event_id,
@@ -308,9 +643,19 @@ def create_event_view(page):
             event_image,
             event_type,
         ]),
-        venue_dropdown,
+        ft.Row([venue_search, venue_dropdown]),
+        ft.Row([
+            repeat,
+            ft.OutlinedButton(
+                'Run Ends',
+                on_click=lambda _: page.open(run_end_date),
+                icon=ft.Icons.EVENT_REPEAT
+            ),
+            run_exceptions,
+        ]),
+        extra_venues,
         #event_name, event_id, event_date, event_start_time, event_end_time, event_description, venue_id, event_image, event_type
-        ft.OutlinedButton("Create Event", icon=ft.Icons.CHECK_CIRCLE_OUTLINE_ROUNDED, on_click=lambda _: add_event(event_name.value, event_id.value, event_date.value, event_start_time.value, event_end_time.value, event_description.value, venue_dropdown.value.split(",")[0], event_image.value, event_type.value))
+        ft.OutlinedButton("Create Event", icon=ft.Icons.CHECK_CIRCLE_OUTLINE_ROUNDED, on_click=create_event)
     ]
     return ft.View(
         '/event',
@@ -355,11 +700,40 @@ def main(page: ft.Page):
     page.on_view_pop = view_pop
     page.go('/')
 
-create_database(
-    host="localhost",
-    user="root",
-    password="admin",   # Replace with your actual password
-    db_name="EventDB")    
+def import_command(argv):
+    parser = argparse.ArgumentParser(prog="event_manager.py import", description="Bulk import venues or events")
+    parser.add_argument("kind", choices=sorted(IMPORT_COLUMNS))
+    parser.add_argument("path", help="CSV, JSON Lines (.jsonl) or JSON array file")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    report = bulk_import(args.path, args.kind, args.chunk_size)
+    for where, error in report["errors"]:
+        print(f"{where}: {error}")
+    print(f"Imported {report['inserted']}/{report['rows']} {args.kind} in {report['seconds']}s "
+          f"({report['rows_per_second']} rows/s, {len(report['errors'])} errors)")
+
+def archive_command(argv):
+    parser = argparse.ArgumentParser(prog="event_manager.py archive",
+                                     description="Move past shows and their tickets into the history tables.")
+    parser.add_argument("--keep-days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive shows older than this")
+    parser.add_argument("--batch-size", type=int, default=200, help="shows per transaction")
+    args = parser.parse_args(argv)
+
+    report = archive_past_shows(db, keep_days=args.keep_days, batch_size=args.batch_size)
+    print(f"Archived {report['shows']} shows and {report['tickets']} tickets in {report['batches']} batches")
+
+if __name__ == "__main__" and sys.argv[1:2] == ["import"]:
+    import_command(sys.argv[2:])
+elif __name__ == "__main__" and sys.argv[1:2] == ["archive"]:
+    archive_command(sys.argv[2:])
+else:
+    if DB_BACKEND == "mysql":
+        create_database(
+            host=DB_CONFIG["host"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            db_name=DB_CONFIG["database"])
 
-ft.app(target=main)
+    ft.app(target=main)
 
@@ -0,0 +1,79 @@
+from typing import Dict, Iterable, List, Optional
+
+# event_summary holds one row per (EventName, type) with upcoming shows:
+# what the homepage shows without reading every upcoming show. Shows with
+# no type are stored under '' because type is part of the primary key.
+#
+# Every change to it is also appended to catalog_changes, whose
+# auto-increment Seq is the sequence number clients sync from.
+
+_SUMMARY_COLUMNS = "EventName, type, image, description, EarliestDate, ShowCount"
+
+_SUMMARY_SELECT = """
+    SELECT E.EventName, COALESCE(E.type, ''), MIN(E.image), MIN(E.description), MIN(E.Date), COUNT(*)
+    FROM Events E
+    JOIN Venues V ON E.VenueID = V.VenueID
+    WHERE E.Date >= CURDATE() {}
+    GROUP BY E.EventName, COALESCE(E.type, '')
+"""
+
+
+def record_catalog_changes(cursor, kind: str, names: Iterable[str]) -> None:
+    """Append changes to the catalog feed; `kind` is 'event' or 'venue'."""
+    rows = [(kind, name) for name in sorted(set(names))]
+    if rows:
+        cursor.executemany("INSERT INTO catalog_changes (Kind, Name) VALUES (%s, %s)", rows)
+
+
+def _summary_rows(cursor, names: Optional[List[str]] = None) -> Dict[str, list]:
+    query = f"SELECT {_SUMMARY_COLUMNS} FROM event_summary"
+    params = ()
+    if names is not None:
+        query += f" WHERE EventName IN ({', '.join(['%s'] * len(names))})"
+        params = names
+    cursor.execute(query, params)
+    rows: Dict[str, list] = {}
+    for row in cursor.fetchall():
+        rows.setdefault(row[0], []).append(tuple(str(value) for value in row))
+    return {name: sorted(group) for name, group in rows.items()}
+
+
+def _record_differences(cursor, before: Dict[str, list], after: Dict[str, list]) -> None:
+    changed = [name for name in set(before) | set(after) if before.get(name) != after.get(name)]
+    record_catalog_changes(cursor, "event", changed)
+
+
+def refresh_event_summary(cursor, event_names: Iterable[str]) -> None:
+    """Recompute the summary rows for `event_names` from their upcoming shows.
+
+    Run it in the same transaction as the write that changed those events.
+    """
+    names = sorted(set(event_names))
+    if not names:
+        return
+    placeholders = ", ".join(["%s"] * len(names))
+    before = _summary_rows(cursor, names)
+    cursor.execute(f"DELETE FROM event_summary WHERE EventName IN ({placeholders})", names)
+    cursor.execute(f"INSERT INTO event_summary ({_SUMMARY_COLUMNS}) "
+                   + _SUMMARY_SELECT.format(f"AND E.EventName IN ({placeholders})"), names)
+    _record_differences(cursor, before, _summary_rows(cursor, names))
+
+
+def roll_forward_event_summary(cursor) -> int:
+    """Refresh the events whose earliest summarized show is now in the past.
+
+    Returns:
+        int: number of events refreshed
+    """
+    cursor.execute("SELECT DISTINCT EventName FROM event_summary WHERE EarliestDate < CURDATE()")
+    names = [row[0] for row in cursor.fetchall()]
+    refresh_event_summary(cursor, names)
+    return len(names)
+
+
+def rebuild_event_summary(cursor) -> None:
+    """Recompute the whole summary, e.g. on a database that predates it."""
+    before = _summary_rows(cursor)
+    cursor.execute("DELETE FROM event_summary")
+    cursor.execute(f"INSERT INTO event_summary ({_SUMMARY_COLUMNS}) " + _SUMMARY_SELECT.format(""))
+    _record_differences(cursor, before, _summary_rows(cursor))
@@ -0,0 +1,252 @@
+import hashlib
+import http.client
+import io
+import ipaddress
+import os
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Without Pillow /image answers 503; originals are never served unresized
+    Image = None
+
+# Pixel sizes of the variants the client asks for: the homepage card and the details banner
+IMAGE_SIZES: Dict[str, Tuple[int, int]] = {
+    "card": (360, 480),
+    "banner": (1200, 480),
+}
+# Sources larger than this are refused rather than downloaded
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+ALLOWED_SCHEMES = ("http", "https")
+
+
+def _public_addresses(host: str, port: int) -> List[str]:
+    """`host`'s addresses; ValueError if any of them isn't public."""
+    try:
+        addresses = list(dict.fromkeys(info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)))
+    except (socket.gaierror, UnicodeError) as e:
+        raise OSError(f"Can't resolve image host {host}: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"Image host {host} is not a public address ({ip})")
+    return addresses
+
+
+def check_source(url: str) -> None:
+    """Raise ValueError unless `url` is http(s) on a host with only public addresses.
+
+    Keeps /image from being pointed at the server's own files or at hosts
+    on its internal network (loopback, private, link-local and the like).
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ALLOWED_SCHEMES or not parts.hostname:
+        raise ValueError(f"Unsupported image URL {url!r}")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError as e:
+        raise ValueError(f"Unsupported image URL {url!r}: {e}")
+    _public_addresses(parts.hostname, port)
+
+
+def _connect_public(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+    """socket.create_connection that only connects to an address it has just checked.
+
+    Resolving the name again for the connection would let a host answer
+    check_source with a public address and the connection with an internal
+    one (DNS rebinding).
+    """
+    host, port = address
+    error = None
+    for ip in _public_addresses(host, port):
+        try:
+            return socket.create_connection((ip, port), timeout, source_address)
+        except OSError as e:
+            error = e
+    raise error
+
+
+class _CheckedHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _CheckedHTTPSConnection(http.client.HTTPSConnection):
+    # Host header, SNI and certificate checks still use the URL's host name
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _CheckedHTTPHandler(urllib.request.HTTPHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(_CheckedHTTPConnection, req, **kwargs)
+
+
+class _CheckedHTTPSHandler(urllib.request.HTTPSHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(_CheckedHTTPSConnection, req, **kwargs)
+
+
+class _CheckedRedirects(urllib.request.HTTPRedirectHandler):
+    """Apply check_source to every redirect, not just the first URL."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_source(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# No proxies: a proxy would resolve the host itself, out of reach of the address checks
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}), _CheckedHTTPHandler,
+                                      _CheckedHTTPSHandler, _CheckedRedirects)
+
+
+def content_type(url: str) -> str:
+    """Content type of what ImageCache.get returns for `url`."""
+    return "image/jpeg"
+
+
+class ImageCache:
+    """Event images fetched once and stored on disk with resized variants.
+
+    Files are keyed by a hash of the source URL. A file's mtime is when it
+    was fetched: after `refresh_after` seconds the source is fetched again,
+    so a changed image at the same URL shows up. Every hit bumps the
+    file's atime; when the cache outgrows `max_bytes` the least recently
+    used files are deleted until it is back under 90% of the limit.
+    """
+
+    def __init__(self, root: str, max_bytes: int, fetch_timeout: float = 10.0, refresh_after: float = 86400):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fetch_timeout = fetch_timeout
+        self.refresh_after = refresh_after
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._size = sum(entry.stat().st_size for entry in os.scandir(root) if entry.is_file())
+        self.stats = {"hits": 0, "misses": 0, "fetches": 0, "evictions": 0}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, url: str, size: str) -> Tuple[bytes, str]:
+        """JPEG bytes of `url`'s image resized for `size`, and an ETag (a hash of those bytes).
+
+        Raises:
+            ValueError: for an unknown size, a URL that isn't allowed, or a
+                source that isn't a usable image
+            OSError: if the source can't be fetched
+            RuntimeError: if Pillow isn't installed
+        """
+        if size not in IMAGE_SIZES:
+            raise ValueError(f"Unknown image size {size!r}")
+        if Image is None:
+            raise RuntimeError("Pillow is not installed; event images can't be resized")
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        original = os.path.join(self.root, f"{key}-original")
+        variant = os.path.join(self.root, f"{key}-{size}.jpg")
+        data = self._read(variant)
+        if data is not None:
+            with self._lock:
+                self.stats["hits"] += 1
+        else:
+            with self._key_lock(key):
+                # Another request may have made it while we waited
+                data = self._read(variant)
+                if data is None:
+                    with self._lock:
+                        self.stats["misses"] += 1
+                    source = self._read(original)
+                    fetched = source is None
+                    if fetched:
+                        source = self._fetch(url)
+                    # Resize before storing anything, so a bad source isn't cached
+                    data = self._resize(source, IMAGE_SIZES[size])
+                    if fetched:
+                        self._store(original, source)
+                    self._store(variant, data)
+            self._evict()
+        return data, hashlib.sha1(data).hexdigest()
+
+    def _read(self, path: str):
+        """The file's bytes, marking it recently used; None if it isn't cached or is due a refresh."""
+        try:
+            fetched_at = os.stat(path).st_mtime
+            if time.time() - fetched_at > self.refresh_after:
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, (time.time(), fetched_at))
+        except FileNotFoundError:
+            return None
+        return data
+
+    def _fetch(self, url: str) -> bytes:
+        check_source(url)
+        request = urllib.request.Request(url, headers={"User-Agent": "EventBite image cache"})
+        with _opener.open(request, timeout=self.fetch_timeout) as response:
+            data = response.read(MAX_SOURCE_BYTES + 1)
+        if len(data) > MAX_SOURCE_BYTES:
+            raise OSError(f"Image at {url} is larger than {MAX_SOURCE_BYTES} bytes")
+        with self._lock:
+            self.stats["fetches"] += 1
+        return data
+
+    @staticmethod
+    def _resize(source: bytes, size: Tuple[int, int]) -> bytes:
+        try:
+            with Image.open(io.BytesIO(source)) as image:
+                image = ImageOps.exif_transpose(image)
+                # Crop to fill, as the client's ImageFit.COVER would
+                image = ImageOps.fit(image.convert("RGB"), size, Image.LANCZOS)
+        except Image.DecompressionBombError as e:
+            raise ValueError(f"Image is too large to decode: {e}")
+        except (OSError, SyntaxError, ValueError) as e:
+            # UnidentifiedImageError and truncated or corrupt data
+            raise ValueError(f"Image can't be decoded: {e}")
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=82, optimize=True, progressive=True)
+        return out.getvalue()
+
+    def _store(self, path: str, data: bytes) -> None:
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += len(data) - replaced
+
+    def _evict(self) -> None:
+        with self._lock:
+            if self._size <= self.max_bytes:
+                return
+            entries = sorted((entry for entry in os.scandir(self.root) if entry.is_file() and not entry.name.endswith(".tmp")),
+                             key=lambda entry: entry.stat().st_atime)
+            self._size = sum(entry.stat().st_size for entry in entries)
+            for entry in entries:
+                if self._size <= self.max_bytes * 0.9:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                self._size -= size
+                self.stats["evictions"] += 1
+
+    def cache_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, bytes=self._size)
@@ -0,0 +1,337 @@
+"""Load test the booking flow against a local server.
+
+Starts server.py's Flask app on a local port with an in-memory stand-in for
+the database, then runs virtual users through the full journey: homepage
+(list_events + get_event_types), get_event_shows, get_venue_seats,
+lock_seats, create_ticket and get_user_tickets. Reports throughput,
+p50/p95/p99 latency and error rate per endpoint.
+
+With --backend sqlite the real database_operations run against a fresh
+SQLite file instead of the stand-in, and the run also checks that no seat
+was sold twice. The stand-in does its own booking, so it can't show that.
+
+Usage: python loadtest.py [--users 50] [--duration 30] [--events 40] ...
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from werkzeug.serving import make_server
+
+from seat_holds import HOLD_SECONDS
+
+
+class StandInDB:
+    """In-memory replacement for the database_operations functions server.py calls.
+
+    Booking follows the same rules as the real code: a hold lasts
+    HOLD_SECONDS and belongs to its hold_id, and a lock or ticket fails if
+    any seat is booked or held under another hold. Every call sleeps
+    `latency` seconds to stand in for the database round trip.
+    """
+
+    def __init__(self, events: int, shows_per_event: int, rows: int, cols: int, latency: float):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.shows: Dict[int, Dict[str, Any]] = {}
+        self.seats = [f"{chr(65 + r)}{c}" for r in range(rows) for c in range(1, cols + 1)]
+        self.unavailable = random.sample(self.seats, len(self.seats) // 20)
+        self.tickets: List[Dict[str, Any]] = []
+        # Held seats by event: seat -> (hold_id, expiry time)
+        self.holds: Dict[int, Dict[str, Tuple[str, float]]] = defaultdict(dict)
+        self._next_ticket = 1
+
+        today = datetime.date.today()
+        event_id = 1
+        for e in range(events):
+            for s in range(shows_per_event):
+                self.shows[event_id] = {
+                    'EventID': event_id, 'EventName': f"Event {e}", 'type': random.choice(["Concert", "Play", "Comedy"]),
+                    'image': None, 'description': "Load test event", 'Date': today + datetime.timedelta(days=s),
+                    'StartTime': datetime.timedelta(hours=19), 'EndTime': datetime.timedelta(hours=21),
+                    'VenueID': "V1", 'VenueName': "Load Test Hall",
+                }
+                event_id += 1
+
+    def _wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_event_name(self, event_id: int) -> str:
+        self._wait()
+        return self.shows[int(event_id)]['EventName']
+
+    def list_events(self, event_type: str = None, include_shows: bool = False) -> List[Dict[str, Any]]:
+        self._wait()
+        events = {}
+        for show in self.shows.values():
+            if event_type and event_type.lower() != "all" and show['type'].lower() != event_type.lower():
+                continue
+            event = events.setdefault(show['EventName'], {
+                'EventName': show['EventName'], 'type': show['type'], 'image': show['image'],
+                'description': show['description'], 'EarliestDate': show['Date'], 'ShowCount': 0, 'shows': [],
+            })
+            event['shows'].append(show)
+            event['ShowCount'] += 1
+            event['EarliestDate'] = min(event['EarliestDate'], show['Date'])
+        return sorted(events.values(), key=lambda e: (e['EarliestDate'], e['EventName']))
+
+    def get_event_shows(self, event_name: str) -> List[Dict[str, Any]]:
+        self._wait()
+        return [show for show in self.shows.values() if show['EventName'] == event_name]
+
+    def get_event_types(self) -> List[str]:
+        self._wait()
+        return sorted({show['type'] for show in self.shows.values()})
+
+    def register_user(self, username: str, password: str, name: str) -> bool:
+        self._wait()
+        return True
+
+    def check_credentials(self, username: str, password: str) -> bool:
+        self._wait()
+        return True
+
+    def _taken(self, event_id: int, holder: Optional[str] = None) -> set:
+        """Seats booked or held by anyone but `holder`; call with the lock held."""
+        now = time.time()
+        taken = {seat for t in self.tickets if t['EventID'] == event_id for seat in t['Seats']}
+        return taken | {seat for seat, (hold_id, expires) in self.holds[event_id].items()
+                        if hold_id != holder and expires > now}
+
+    def get_venue_seats(self, event_id: int) -> Tuple[List[str], List[str], List[str]]:
+        self._wait()
+        with self._lock:
+            booked = self._taken(event_id)
+        return self.seats, self.unavailable, list(booked)
+
+    def lock_seats(self, selected_seats: List[str], event_id: int, hold_id: Optional[str] = None) -> Dict[str, Any]:
+        self._wait()
+        hold_id = hold_id or uuid.uuid4().hex
+        with self._lock:
+            conflicts = sorted(self._taken(event_id, hold_id) & set(selected_seats))
+            if conflicts:
+                return {"held": False, "hold_id": None, "conflicts": conflicts}
+            expires = time.time() + HOLD_SECONDS
+            self.holds[event_id].update((seat, (hold_id, expires)) for seat in selected_seats)
+        return {"held": True, "hold_id": hold_id, "conflicts": []}
+
+    def create_ticket(self, event_id: int, username: str, seats: List[str], hold_id: Optional[str] = None) -> Optional[int]:
+        self._wait()
+        with self._lock:
+            if self._taken(event_id, hold_id or username) & set(seats):
+                return None
+            ticket_id = self._next_ticket
+            self._next_ticket += 1
+            self.tickets.append({'TicketID': ticket_id, 'EventID': event_id, 'Seats': list(seats), 'Username': username})
+            for seat in seats:
+                self.holds[event_id].pop(seat, None)
+        return ticket_id
+
+    def get_user_tickets(self, username: str, since: int = 0) -> List[Dict[str, Any]]:
+        self._wait()
+        with self._lock:
+            mine = [dict(t) for t in self.tickets if t['Username'] == username and t['TicketID'] > since]
+        for ticket in mine:
+            show = self.shows[ticket['EventID']]
+            ticket.update(EventName=show['EventName'], Date=show['Date'], StartTime=show['StartTime'], VenueName=show['VenueName'])
+        return mine
+
+    def release_locked_seats(self, event_id: int, seats, hold_id: str) -> int:
+        self._wait()
+        with self._lock:
+            held = self.holds[event_id]
+            mine = [seat for seat in seats if held.get(seat, (None,))[0] == hold_id]
+            for seat in mine:
+                del held[seat]
+        return len(mine)
+
+    def seed(self, execute_query) -> None:
+        """Write the synthetic catalog to a real database instead of serving it from memory."""
+        rows, cols = self.seats[-1][0], self.seats[-1][1:]
+        execute_query("INSERT INTO Venues (VenueName, VenueID, RowsColumns, NoSeats) VALUES (%s, %s, %s, %s)",
+                      ("Load Test Hall", "V1", f"{ord(rows) - 64}x{cols}", ",".join(self.unavailable)))
+        for show in self.shows.values():
+            execute_query("""
+                INSERT INTO Events (EventName, EventID, Date, StartTime, EndTime, description, VenueID, image, type)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (show['EventName'], show['EventID'], show['Date'], show['StartTime'], show['EndTime'],
+                  show['description'], show['VenueID'], show['image'], show['type']))
+
+    def install(self, module) -> None:
+        for name in ("get_event_name", "list_events", "get_event_shows", "get_event_types", "register_user",
+                     "check_credentials", "get_venue_seats", "lock_seats", "create_ticket", "get_user_tickets",
+                     "release_locked_seats"):
+            setattr(module, name, getattr(self, name))
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.queued = 0
+        self.journeys = 0
+        self.failed_bookings = 0
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+class VirtualUser:
+    def __init__(self, base_url: str, username: str, stats: Stats, seats_per_booking: int):
+        self.base_url = base_url
+        self.username = username
+        self.stats = stats
+        self.seats_per_booking = seats_per_booking
+        self.http = requests.Session()
+
+    def call(self, endpoint: str, method: str = "GET", **kwargs) -> Any:
+        headers = {}
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.http.request(method, f"{self.base_url}/{endpoint}", headers=headers, timeout=30, **kwargs)
+            except requests.RequestException:
+                self.stats.record(endpoint, time.perf_counter() - start, False)
+                return None
+            if response.status_code == 429:
+                with self.stats._lock:
+                    self.stats.queued += 1
+                headers["X-Queue-Token"] = response.json()["queue_token"]
+                time.sleep(float(response.headers.get("Retry-After", 1)))
+                continue
+            self.stats.record(endpoint, time.perf_counter() - start, response.ok)
+            return response.json() if response.ok else None
+
+    def login(self) -> None:
+        credentials = {"username": self.username, "password": "load", "name": self.username}
+        token = (self.call("register_user", "POST", json=credentials)
+                 or self.call("check_credentials", "POST", json=credentials))
+        self.http.headers["Authorization"] = f"Bearer {token}"
+
+    def journey(self) -> None:
+        events = self.call("list_events") or []
+        self.call("get_event_types")
+        if not events:
+            return
+        event = random.choice(events)
+        shows = self.call("get_event_shows", params={"event_name": event["EventName"]}) or []
+        if not shows:
+            return
+        event_id = random.choice(shows)["EventID"]
+        seats = self.call("get_venue_seats", params={"event_id": event_id})
+        if not seats:
+            return
+        taken = set(seats["unavailable"]) | set(seats["booked"])
+        free = [seat for seat in seats["all"] if seat not in taken]
+        if len(free) < self.seats_per_booking:
+            return
+        wanted = random.sample(free, self.seats_per_booking)
+        booked = False
+        hold = self.call("lock_seats", "POST", json={"selected_seats": wanted, "event_id": event_id})
+        if hold and hold["held"]:
+            booked = bool(self.call("create_ticket", "POST",
+                                    json={"event_id": event_id, "seats": wanted, "hold_id": hold["hold_id"]}))
+        self.call("get_user_tickets")
+        with self.stats._lock:
+            self.stats.journeys += 1
+            self.stats.failed_bookings += not booked
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _database_double_bookings(execute_query) -> int:
+    sold = defaultdict(int)
+    for ticket in execute_query("SELECT EventID, Seats FROM tickets", fetch='all'):
+        for seat in json.loads(ticket['Seats']):
+            sold[(str(ticket['EventID']), seat)] += 1
+    return sum(count - 1 for count in sold.values() if count > 1)
+
+
+def run(args) -> Stats:
+    if args.backend == "sqlite":
+        # Must be set before database_operations is imported
+        os.environ["EVENTBITE_DB_BACKEND"] = "sqlite"
+        os.environ["EVENTBITE_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="eventbite-load-"), "load.db")
+        # Registering every virtual user shouldn't dominate the run
+        os.environ.setdefault("EVENTBITE_PBKDF2_ITERATIONS", "1000")
+    import server
+
+    db = StandInDB(args.events, args.shows_per_event, args.rows, args.cols, args.db_latency_ms / 1000)
+    if args.backend == "sqlite":
+        db.seed(server.execute_query)
+        server.refresh_event_summary(rebuild=True)
+    else:
+        db.install(server)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    httpd = make_server("127.0.0.1", args.port, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{httpd.server_port}"
+
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+
+    def user_loop(n: int) -> None:
+        user = VirtualUser(base_url, f"loaduser{n}", stats, args.seats_per_booking)
+        user.login()
+        while time.monotonic() < deadline:
+            user.journey()
+
+    started = time.perf_counter()
+    users = [threading.Thread(target=user_loop, args=(n,)) for n in range(args.users)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.perf_counter() - started
+    httpd.shutdown()
+
+    total = sum(len(v) for v in stats.latencies.values())
+    print(f"{args.users} users, {elapsed:.1f}s: {total} requests ({total / elapsed:.1f} req/s), "
+          f"{stats.journeys} journeys, {stats.failed_bookings} without a ticket, {stats.queued} queued responses")
+    print(f"{'endpoint':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint in sorted(stats.latencies):
+        values = stats.latencies[endpoint]
+        print(f"{endpoint:<20}{len(values):>8}{stats.errors[endpoint]:>8}"
+              + "".join(f"{_percentile(values, p) * 1000:>10.1f}" for p in (50, 95, 99)))
+    if args.backend != "sqlite":
+        print("Double-booked seats: not checked, the stand-in does the booking itself; "
+              "run with --backend sqlite to check the real booking code")
+        return stats
+    violations = _database_double_bookings(server.execute_query)
+    print(f"Double-booked seats: {violations}")
+    if violations:
+        raise SystemExit(1)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["standin", "sqlite"], default="standin")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--events", type=int, default=40)
+    parser.add_argument("--shows-per-event", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=30)
+    parser.add_argument("--seats-per-booking", type=int, default=2)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="simulated time per database call")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    run(parser.parse_args())
@@ -0,0 +1,107 @@
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Latency histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _RouteStats:
+    __slots__ = ("requests", "errors", "in_flight", "buckets", "latency_sum")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+
+
+class Metrics:
+    """Per-route request counters and latency histograms in Prometheus text format.
+
+    Recording a request is one lock acquisition and a bisect, cheap enough
+    for every request. Other components add their numbers with register_collector.
+    """
+
+    def __init__(self, prefix: str = "eventbite"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._routes: Dict[str, _RouteStats] = {}
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, float]], frozenset]] = []
+
+    def _route(self, route: str) -> _RouteStats:
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes.setdefault(route, _RouteStats())
+        return stats
+
+    def request_started(self, route: str) -> None:
+        with self._lock:
+            self._route(route).in_flight += 1
+
+    def request_finished(self, route: str, seconds: float, error: bool) -> None:
+        with self._lock:
+            stats = self._route(route)
+            stats.in_flight -= 1
+            stats.requests += 1
+            stats.errors += error
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.latency_sum += seconds
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(stats.in_flight for stats in self._routes.values())
+
+    def register_collector(self, name: str, collect: Callable[[], Dict[str, float]],
+                           counters: Iterable[str] = ()) -> None:
+        """Export the numbers returned by `collect()` as gauges named <prefix>_<name>_<key>.
+
+        Keys listed in `counters` only ever grow; they are exported as
+        counters named <prefix>_<name>_<key>_total so rate() works on them.
+        """
+        self._collectors.append((name, collect, frozenset(counters)))
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_requests_total Requests handled, by route.",
+            f"# TYPE {p}_requests_total counter",
+        ]
+        with self._lock:
+            routes = sorted((route, stats.requests, stats.errors, stats.in_flight, list(stats.buckets), stats.latency_sum)
+                            for route, stats in self._routes.items())
+        for route, requests, _, _, _, _ in routes:
+            lines.append(f'{p}_requests_total{{route="{route}"}} {requests}')
+        lines += [f"# HELP {p}_request_errors_total Requests that ended in a 5xx response, by route.",
+                  f"# TYPE {p}_request_errors_total counter"]
+        for route, _, errors, _, _, _ in routes:
+            lines.append(f'{p}_request_errors_total{{route="{route}"}} {errors}')
+        lines += [f"# HELP {p}_requests_in_flight Requests being handled right now, by route.",
+                  f"# TYPE {p}_requests_in_flight gauge"]
+        for route, _, _, in_flight, _, _ in routes:
+            lines.append(f'{p}_requests_in_flight{{route="{route}"}} {in_flight}')
+        lines += [f"# HELP {p}_request_duration_seconds Request latency, by route.",
+                  f"# TYPE {p}_request_duration_seconds histogram"]
+        for route, requests, _, _, buckets, latency_sum in routes:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+                cumulative += count
+                lines.append(f'{p}_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_request_duration_seconds_sum{{route="{route}"}} {latency_sum:.6f}')
+            lines.append(f'{p}_request_duration_seconds_count{{route="{route}"}} {requests}')
+
+        for name, collect, counters in self._collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"Metrics collector {name} failed: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                if key in counters:
+                    lines.append(f"# TYPE {p}_{name}_{key}_total counter")
+                    lines.append(f"{p}_{name}_{key}_total {value}")
+                else:
+                    lines.append(f"# TYPE {p}_{name}_{key} gauge")
+                    lines.append(f"{p}_{name}_{key} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,175 @@
+"""Microbenchmarks for the server's data and serialization hot paths.
+
+Runs over a synthetic dataset through a fake execute_query, so no database
+is needed. Results can be saved as JSON and compared with an earlier run:
+
+    python microbench.py --save before.json
+    python microbench.py --compare before.json --threshold 0.10
+
+Covered: list_events grouping (full scan and summary table), get_venue_seats seat parsing, the
+api_response dumps/loads/jsonify chain, and the client's _desanitize.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "client"))
+
+import database_operations
+import server
+from db import _desanitize
+from statements import STATEMENTS
+
+
+class FakeDB:
+    """Answers database_operations' queries from synthetic rows."""
+
+    def __init__(self, events: int, shows_per_event: int, rows: int, cols: int, tickets: int):
+        today = datetime.date.today()
+        self.show_rows = []
+        event_id = 1
+        for e in range(events):
+            for s in range(shows_per_event):
+                self.show_rows.append({
+                    'EventID': event_id, 'EventName': f"Event {e:05d}", 'type': random.choice(["Concert", "Play", "Comedy"]),
+                    'image': f"https://example.com/{e}.jpg", 'description': "Synthetic event " * 8,
+                    'Date': today + datetime.timedelta(days=random.randint(0, 90)),
+                    'StartTime': datetime.timedelta(hours=19), 'EndTime': datetime.timedelta(hours=21),
+                    'VenueID': "V1", 'VenueName': "Bench Hall",
+                })
+                event_id += 1
+        self.show_rows.sort(key=lambda r: (r['EventName'], r['Date'], r['StartTime']))
+        summary = {}
+        for show in self.show_rows:
+            row = summary.setdefault((show['EventName'], show['type']), {
+                'EventName': show['EventName'], 'type': show['type'], 'image': show['image'],
+                'description': show['description'], 'EarliestDate': show['Date'], 'ShowCount': 0,
+            })
+            row['ShowCount'] += 1
+            row['EarliestDate'] = min(row['EarliestDate'], show['Date'])
+        self.summary_rows = list(summary.values())
+
+        seats = [f"{chr(65 + r)}{c}" for r in range(rows) for c in range(1, cols + 1)]
+        random.shuffle(seats)
+        self.venue = {'RowsColumns': f"{rows}x{cols}", 'NoSeats': ",".join(seats[:len(seats) // 20])}
+        per_ticket = max(1, len(seats) // 2 // max(tickets, 1))
+        self.ticket_rows = [{'Seats': json.dumps(seats[i * per_ticket:(i + 1) * per_ticket])} for i in range(tickets)]
+        self.hold_rows = [{'Seat': seat} for seat in seats[-4:]]
+
+    def execute_query(self, query: str, params: tuple = None, fetch: str = None, **kwargs) -> Any:
+        if "FROM event_summary" in query:
+            return self.summary_rows
+        if "FROM Events E" in query and "RowsColumns" not in query:
+            return self.show_rows
+        if "RowsColumns" in query:
+            return self.venue
+        if "FROM tickets" in query:
+            return self.ticket_rows
+        if "FROM seat_holds" in query:
+            return self.hold_rows
+        raise ValueError(f"FakeDB has no answer for: {query}")
+
+    def execute_statement(self, name: str, params: tuple, fetch: str = None) -> Any:
+        return self.execute_query(STATEMENTS[name], params, fetch)
+
+
+def _time(func: Callable[[], Any], min_time: float) -> Dict[str, float]:
+    """Run `func` repeatedly for at least `min_time` seconds; per-call times in seconds."""
+    func()
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "runs": len(samples)}
+
+
+def run(args) -> Dict[str, Any]:
+    random.seed(args.seed)
+    fake = FakeDB(args.events, args.shows_per_event, args.rows, args.cols, args.tickets)
+    database_operations.execute_query = fake.execute_query
+    database_operations.execute_statement = fake.execute_statement
+
+    events = database_operations.list_events(include_shows=True)
+    wire = json.loads(json.dumps(events, default=server.json_serial))
+    respond = server.api_response(lambda: events)
+
+    def api_response_chain():
+        with server.app.test_request_context():
+            respond()
+
+    benchmarks = {
+        "list_events_grouping": lambda: database_operations.list_events(include_shows=True),
+        "list_events_summary": database_operations.list_events,
+        "get_venue_seats_parsing": lambda: database_operations.get_venue_seats(1),
+        "api_response_chain": api_response_chain,
+        "client_desanitize": lambda: _desanitize(wire),
+    }
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = _time(func, args.min_time)
+        print(f"{name:<26}{results[name]['median_s'] * 1000:>10.3f} ms median{results[name]['min_s'] * 1000:>10.3f} ms min")
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("save", "compare", "threshold")},
+        "results": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline_path: str, threshold: float) -> bool:
+    """Print the change against a saved run; False if anything slowed down by more than `threshold`.
+
+    Runs are compared on their fastest call, which is the least noisy estimate.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline["params"] != report["params"]:
+        print("Warning: baseline was run with different parameters")
+    ok = True
+    for name, result in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["min_s"]
+        change = (result["min_s"] - before) / before
+        flag = "REGRESSION" if change > threshold else ""
+        ok = ok and not flag
+        print(f"{name:<26}{change:>+9.1%}  {flag}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--shows-per-event", type=int, default=6)
+    parser.add_argument("--rows", type=int, default=26)
+    parser.add_argument("--cols", type=int, default=60)
+    parser.add_argument("--tickets", type=int, default=400)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to spend on each benchmark")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare and not compare(report, args.compare, args.threshold):
+        raise SystemExit(1)
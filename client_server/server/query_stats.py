@@ -0,0 +1,90 @@
+import functools
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Off by default; execute_query skips all of this unless EVENTBITE_QUERY_STATS=1
+ENABLED = os.environ.get("EVENTBITE_QUERY_STATS") == "1"
+SLOW_QUERY_MS = float(os.environ.get("EVENTBITE_SLOW_QUERY_MS", 200))
+SLOW_QUERY_LOG = os.environ.get("EVENTBITE_SLOW_QUERY_LOG", "slow_queries.log")
+# The same statement this many times in one request is reported as a likely N+1
+REPEAT_WARNING = 10
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query: str) -> str:
+    """Normalize a statement so queries differing only in values group together."""
+    normalized = _STRING.sub("?", query)
+    normalized = _NUMBER.sub("?", normalized).replace("%s", "?")
+    normalized = _PLACEHOLDER_LIST.sub("(?+)", normalized)
+    return _SPACE.sub(" ", normalized).strip()
+
+
+class QueryStats:
+    """Per-statement timing, row counts and per-request query counts."""
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS, slow_query_log: str = SLOW_QUERY_LOG):
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        self._lock = threading.Lock()
+        self._by_fingerprint: Dict[str, Dict[str, float]] = {}
+        self._request = threading.local()
+        self.slow_queries = 0
+
+    def record(self, query: str, seconds: float, rows: int) -> None:
+        key = fingerprint(query)
+        with self._lock:
+            stats = self._by_fingerprint.get(key)
+            if stats is None:
+                stats = self._by_fingerprint[key] = {"count": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0}
+            stats["count"] += 1
+            stats["total_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds)
+            stats["rows"] += rows
+        counts = getattr(self._request, "counts", None)
+        if counts is not None:
+            counts[key] = counts.get(key, 0) + 1
+        if seconds * 1000 >= self.slow_query_ms:
+            self._log_slow(key, seconds, rows)
+
+    def _log_slow(self, key: str, seconds: float, rows: int) -> None:
+        with self._lock:
+            self.slow_queries += 1
+            with open(self.slow_query_log, "a", encoding="utf-8") as f:
+                f.write(f"{time.strftime('%Y-%m-%dT%H:%M:%S')} {seconds * 1000:.1f}ms rows={rows} {key}\n")
+
+    def begin_request(self) -> None:
+        self._request.counts = {}
+
+    def end_request(self) -> Optional[Dict[str, int]]:
+        """Statement counts for the request on this thread; warns about likely N+1 patterns."""
+        counts = getattr(self._request, "counts", None)
+        self._request.counts = None
+        if counts:
+            for key, count in counts.items():
+                if count >= REPEAT_WARNING:
+                    print(f"Possible N+1: {count}x {key}")
+        return counts
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Statements with the most total time."""
+        with self._lock:
+            rows = [dict(stats, query=key) for key, stats in self._by_fingerprint.items()]
+        rows.sort(key=lambda r: r["total_s"], reverse=True)
+        return rows[:limit]
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "queries": sum(s["count"] for s in self._by_fingerprint.values()),
+                "seconds": round(sum(s["total_s"] for s in self._by_fingerprint.values()), 6),
+                "slow": self.slow_queries,
+                "statements": len(self._by_fingerprint),
+            }
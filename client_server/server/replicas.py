@@ -0,0 +1,133 @@
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import DB_CONFIG
+from connection import ConnectionManager
+
+
+def replica_config(endpoint: str) -> Dict[str, Any]:
+    """DB_CONFIG pointed at a "host[:port]" replica endpoint."""
+    host, _, port = endpoint.partition(":")
+    config = dict(DB_CONFIG, host=host)
+    if port:
+        config["port"] = int(port)
+    return config
+
+
+class _Replica:
+    def __init__(self, endpoint: str, pool_size: int):
+        self.endpoint = endpoint
+        self.db = ConnectionManager(replica_config(endpoint), pool_size=pool_size)
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+
+class ReplicaRouter:
+    """Round-robin reads over healthy replicas.
+
+    A background thread, started by the first read, checks each replica
+    every `check_interval` seconds and keeps it in rotation only while it
+    is replicating and no more than `max_lag` seconds behind the primary;
+    until the first check passes, reads go to the primary. A replica whose query fails is
+    taken out straight away and comes back after its next good check.
+    Callers fall back to the primary whenever reader() returns None.
+    """
+
+    def __init__(self, endpoints: List[str], max_lag: float = 5.0, check_interval: float = 5.0, pool_size: int = 4):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._replicas = [_Replica(endpoint, pool_size) for endpoint in endpoints]
+        self._cycle = itertools.cycle(self._replicas)
+        self._lock = threading.Lock()
+        # key -> monotonic time until which that key's reads stay on the primary
+        self._pinned: Dict[str, float] = {}
+        self._checker = None
+        self.stats = {"replica_reads": 0, "primary_reads": 0, "failures": 0}
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._checker is not None:
+                return
+            self._checker = threading.Thread(target=self._check_loop, daemon=True)
+        self._checker.start()
+
+    def _check_loop(self) -> None:
+        while True:
+            self.check_all()
+            time.sleep(self.check_interval)
+
+    def check_all(self) -> None:
+        for replica in self._replicas:
+            healthy, lag = self._check(replica)
+            if healthy != replica.healthy:
+                print(f"Replica {replica.endpoint} {'back in rotation' if healthy else 'out of rotation'} (lag {lag})")
+            replica.healthy, replica.lag = healthy, lag
+
+    def _check(self, replica: _Replica):
+        try:
+            try:
+                status = replica.db.execute("SHOW REPLICA STATUS", fetch='one', dictionary=True)
+            except Exception:
+                # Servers before MySQL 8.0.22
+                status = replica.db.execute("SHOW SLAVE STATUS", fetch='one', dictionary=True)
+        except Exception as e:
+            print(f"Replica {replica.endpoint} health check failed: {e}")
+            return False, None
+        if status is None:
+            # Replication isn't configured (or was reset): nothing says it's in sync
+            return False, None
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        # NULL lag means the replication threads are stopped
+        if lag is None:
+            return False, None
+        return float(lag) <= self.max_lag, float(lag)
+
+    def reader(self, key: Optional[str] = None) -> Optional[ConnectionManager]:
+        """A healthy replica's connection manager, or None to read from the primary.
+
+        Reads for a `key` pinned by wrote() stay on the primary until the
+        replicas can be expected to have caught up.
+        """
+        if self._checker is None:
+            self._start()
+        with self._lock:
+            if key is not None:
+                until = self._pinned.get(key)
+                if until is not None:
+                    if until > time.monotonic():
+                        self.stats["primary_reads"] += 1
+                        return None
+                    del self._pinned[key]
+            for _ in range(len(self._replicas)):
+                replica = next(self._cycle)
+                if replica.healthy:
+                    self.stats["replica_reads"] += 1
+                    return replica.db
+            self.stats["primary_reads"] += 1
+        return None
+
+    def wrote(self, key: str) -> None:
+        """Keep reads for `key` on the primary for the next `max_lag` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._pinned) > 10000:
+                self._pinned = {k: until for k, until in self._pinned.items() if until > now}
+            self._pinned[key] = now + self.max_lag
+
+    def failed(self, db: ConnectionManager) -> None:
+        """Take the replica behind `db` out of rotation until its next good check."""
+        for replica in self._replicas:
+            if replica.db is db:
+                if replica.healthy:
+                    print(f"Replica {replica.endpoint} out of rotation after a failed query")
+                replica.healthy = False
+        with self._lock:
+            self.stats["failures"] += 1
+
+    def replica_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.stats, replicas=len(self._replicas),
+                        healthy=sum(replica.healthy for replica in self._replicas),
+                        max_lag=max((r.lag for r in self._replicas if r.lag is not None), default=0))
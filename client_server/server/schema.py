@@ -0,0 +1,174 @@
+from mysql.connector import Error
+
+# Schema changes applied at server start. Each statement must be safe to
+# run again on a database that already has it.
+MIGRATIONS = [
+    # Room for salted password hashes
+    "ALTER TABLE Users MODIFY pwd VARCHAR(255)",
+    # Prefix search in the manager's venue picker
+    "CREATE INDEX idx_venues_name ON venues (VenueName)",
+    # Seat layouts for large halls, stored as encoded seat ranges
+    "ALTER TABLE venues MODIFY NoSeats TEXT",
+    """CREATE TABLE IF NOT EXISTS seat_templates (
+        TemplateName VARCHAR(60) PRIMARY KEY,
+        RowsColumns VARCHAR(12),
+        NoSeats TEXT
+    )""",
+    # Ticket IDs come from id_generator's 63-bit Snowflake IDs, not AUTO_INCREMENT
+    "ALTER TABLE tickets MODIFY TicketID BIGINT NOT NULL",
+    # Homepage summary of upcoming events, kept current by event_summary.py
+    """CREATE TABLE IF NOT EXISTS event_summary (
+        EventName VARCHAR(60) NOT NULL,
+        type VARCHAR(30) NOT NULL DEFAULT '',
+        image VARCHAR(1000),
+        description VARCHAR(1000),
+        EarliestDate DATE,
+        ShowCount INT,
+        PRIMARY KEY (EventName, type),
+        INDEX idx_summary_date (EarliestDate)
+    )""",
+    # Past shows and their tickets, moved out of the live tables by archive.py
+    "CREATE TABLE IF NOT EXISTS events_history LIKE Events",
+    "CREATE TABLE IF NOT EXISTS tickets_history LIKE tickets",
+    "CREATE INDEX idx_tickets_history_user ON tickets_history (Username)",
+    # For a tickets_history copied from tickets before TicketID was widened
+    "ALTER TABLE tickets_history MODIFY TicketID BIGINT NOT NULL",
+    # Change feed for clients' catalog snapshots; Seq is the sync position
+    """CREATE TABLE IF NOT EXISTS catalog_changes (
+        Seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+        Kind VARCHAR(10) NOT NULL,
+        Name VARCHAR(60) NOT NULL
+    )""",
+    # One row per held or booked seat; the key is what makes claims atomic (seat_holds.py)
+    """CREATE TABLE IF NOT EXISTS seat_holds (
+        EventID INT NOT NULL,
+        Seat VARCHAR(8) NOT NULL,
+        Holder VARCHAR(64) NOT NULL,
+        ExpiresAt BIGINT NULL,
+        TicketID BIGINT NULL,
+        PRIMARY KEY (EventID, Seat)
+    )""",
+]
+
+# The whole schema for the SQLite backend, already in its migrated shape
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Users (
+    Name VARCHAR(30),
+    Username VARCHAR(30) PRIMARY KEY,
+    pwd VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS Events (
+    EventID INTEGER NOT NULL PRIMARY KEY,
+    EventName VARCHAR(60),
+    StartTime TIME,
+    EndTime TIME,
+    Date DATE,
+    VenueID VARCHAR(12),
+    type VARCHAR(30),
+    image VARCHAR(1000),
+    description VARCHAR(1000)
+);
+CREATE INDEX IF NOT EXISTS idx_events_date ON Events (Date);
+CREATE INDEX IF NOT EXISTS idx_events_name ON Events (EventName, Date);
+
+CREATE TABLE IF NOT EXISTS Venues (
+    VenueName VARCHAR(30),
+    VenueID VARCHAR(30) PRIMARY KEY,
+    RowsColumns VARCHAR(12),
+    NoSeats TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_venues_name ON Venues (VenueName);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    TicketID INTEGER PRIMARY KEY,
+    Username VARCHAR(30),
+    Seats VARCHAR(256),
+    EventID VARCHAR(30),
+    VenueID VARCHAR(30)
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_event ON tickets (EventID);
+CREATE INDEX IF NOT EXISTS idx_tickets_user ON tickets (Username);
+
+CREATE TABLE IF NOT EXISTS lockedseats (
+    EventID VARCHAR(30),
+    username VARCHAR(30),
+    seats VARCHAR(100)
+);
+CREATE INDEX IF NOT EXISTS idx_lockedseats_event ON lockedseats (EventID);
+
+CREATE TABLE IF NOT EXISTS seat_templates (
+    TemplateName VARCHAR(60) PRIMARY KEY,
+    RowsColumns VARCHAR(12),
+    NoSeats TEXT
+);
+
+CREATE TABLE IF NOT EXISTS event_summary (
+    EventName VARCHAR(60) NOT NULL,
+    type VARCHAR(30) NOT NULL DEFAULT '',
+    image VARCHAR(1000),
+    description VARCHAR(1000),
+    EarliestDate DATE,
+    ShowCount INT,
+    PRIMARY KEY (EventName, type)
+);
+CREATE INDEX IF NOT EXISTS idx_summary_date ON event_summary (EarliestDate);
+
+CREATE TABLE IF NOT EXISTS events_history (
+    EventID INTEGER NOT NULL PRIMARY KEY,
+    EventName VARCHAR(60),
+    StartTime TIME,
+    EndTime TIME,
+    Date DATE,
+    VenueID VARCHAR(12),
+    type VARCHAR(30),
+    image VARCHAR(1000),
+    description VARCHAR(1000)
+);
+
+CREATE TABLE IF NOT EXISTS tickets_history (
+    TicketID INTEGER PRIMARY KEY,
+    Username VARCHAR(30),
+    Seats VARCHAR(256),
+    EventID VARCHAR(30),
+    VenueID VARCHAR(30)
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_history_user ON tickets_history (Username);
+
+CREATE TABLE IF NOT EXISTS catalog_changes (
+    Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    Kind VARCHAR(10) NOT NULL,
+    Name VARCHAR(60) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS seat_holds (
+    EventID INTEGER NOT NULL,
+    Seat VARCHAR(8) NOT NULL,
+    Holder VARCHAR(64) NOT NULL,
+    ExpiresAt BIGINT,
+    TicketID BIGINT,
+    PRIMARY KEY (EventID, Seat)
+);
+"""
+
+# MySQL errors that mean a migration was already applied
+_ALREADY_APPLIED = {
+    1050,  # table exists
+    1060,  # duplicate column
+    1061,  # duplicate index
+}
+
+
+def apply_migrations(conn) -> None:
+    if getattr(conn, "dialect", "mysql") == "sqlite":
+        conn.executescript(SQLITE_SCHEMA)
+        return
+    cursor = conn.cursor()
+    for statement in MIGRATIONS:
+        try:
+            cursor.execute(statement)
+        except Error as e:
+            if e.errno not in _ALREADY_APPLIED:
+                raise
+    conn.commit()
+    cursor.close()
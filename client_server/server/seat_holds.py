@@ -0,0 +1,69 @@
+import time
+from typing import Any, List, Optional
+
+# How long a hold from lock_seats keeps a seat for its holder
+HOLD_SECONDS = 300
+
+
+def claim_seats(cursor, event_id: Any, seats: List[str], holder: str,
+                ticket_id: Optional[int] = None, now: Optional[int] = None) -> List[str]:
+    """Claim every seat in `seats` for `holder`, or none of them.
+
+    Runs inside the caller's transaction. Each seat is one row in
+    seat_holds keyed by (EventID, Seat), so two claims on the same seat
+    collide on the primary key instead of on a lock: the inserts skip
+    seats someone else has, and a locking read of those rows then rolls
+    the claim back to its savepoint unless every seat is ours. Only the
+    rows of the seats asked for are touched.
+
+    Without `ticket_id` the seats are held for HOLD_SECONDS (a holder
+    asking again extends its hold); with it they are booked for good,
+    taking over the holder's own holds.
+
+    Returns:
+        The seats held or booked by someone else; empty when the claim succeeded.
+    """
+    if not seats:
+        return []
+    event_id = int(event_id)
+    now = int(time.time()) if now is None else now
+    expires = None if ticket_id is not None else now + HOLD_SECONDS
+    marks = ", ".join(["%s"] * len(seats))
+    cursor.execute("SAVEPOINT claim_seats")
+    # Expired holds don't count any more; clear them so the inserts can take their seats
+    cursor.execute(f"DELETE FROM seat_holds WHERE EventID = %s AND Seat IN ({marks}) AND ExpiresAt < %s",
+                   (event_id, *seats, now))
+    cursor.execute(f"UPDATE seat_holds SET ExpiresAt = %s, TicketID = %s "
+                   f"WHERE EventID = %s AND Holder = %s AND TicketID IS NULL AND Seat IN ({marks})",
+                   (expires, ticket_id, event_id, holder, *seats))
+    cursor.executemany("INSERT IGNORE INTO seat_holds (EventID, Seat, Holder, ExpiresAt, TicketID) VALUES (%s, %s, %s, %s, %s)",
+                       [(event_id, seat, holder, expires, ticket_id) for seat in seats])
+    # A locking read sees the latest committed rows; a plain SELECT would read
+    # the transaction's snapshot under REPEATABLE READ and could miss a hold
+    # another server committed since, the very row INSERT IGNORE skipped
+    cursor.execute(f"SELECT Seat, Holder, TicketID FROM seat_holds WHERE EventID = %s AND Seat IN ({marks}) FOR UPDATE",
+                   (event_id, *seats))
+    owned = {seat for seat, row_holder, row_ticket in cursor.fetchall()
+             if row_holder == holder and row_ticket == ticket_id}
+    # Anything not ours, including a seat with no row at all, is a conflict
+    conflicts = sorted(set(seats) - owned)
+    if conflicts:
+        cursor.execute("ROLLBACK TO SAVEPOINT claim_seats")
+    cursor.execute("RELEASE SAVEPOINT claim_seats")
+    return conflicts
+
+
+def release_seats(cursor, event_id: Any, seats: List[str], holder: str) -> int:
+    """Drop `holder`'s holds on `seats`; booked seats stay booked. Returns the seats released."""
+    if not seats:
+        return 0
+    marks = ", ".join(["%s"] * len(seats))
+    cursor.execute(f"DELETE FROM seat_holds WHERE EventID = %s AND Holder = %s AND TicketID IS NULL AND Seat IN ({marks})",
+                   (int(event_id), holder, *seats))
+    return cursor.rowcount
+
+
+def purge_expired_holds(cursor, now: Optional[int] = None) -> int:
+    """Delete every expired hold; claims clear the ones in their way, this catches the rest."""
+    cursor.execute("DELETE FROM seat_holds WHERE ExpiresAt < %s", (int(time.time()) if now is None else now,))
+    return cursor.rowcount
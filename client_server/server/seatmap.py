@@ -0,0 +1,101 @@
+import json
+import re
+from typing import Dict, Iterable, List, Set
+
+# Rows are labelled with a single letter, A to Z
+MAX_ROWS = 26
+
+_LABEL = re.compile(r"^([A-Z])(\d+)$")
+
+
+def parse_seat_list(value) -> List[str]:
+    """Parse a stored seat list, either a JSON array or comma-separated labels."""
+    if not value:
+        return []
+    try:
+        seats = json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return [s.strip() for s in str(value).split(',') if s.strip()]
+    return seats if isinstance(seats, list) else [str(seats)]
+
+
+def seat_label(row: int, col: int) -> str:
+    """Label for a zero-based row and one-based column, e.g. (1, 5) -> 'B5'."""
+    if not 0 <= row < MAX_ROWS:
+        raise ValueError(f"row {row + 1} is past row {chr(64 + MAX_ROWS)}; a venue has at most {MAX_ROWS} rows")
+    return f"{chr(65 + row)}{col}"
+
+
+def _split_label(label: str):
+    match = _LABEL.match(label)
+    if not match:
+        raise ValueError(f"invalid seat {label!r}, expected a row letter and a column like 'C5'")
+    return match.group(1), int(match.group(2))
+
+
+def check_grid_size(rows: int, cols: int) -> None:
+    """Raise ValueError unless rows x cols is a grid seat labels can describe."""
+    if rows <= 0 or cols <= 0:
+        raise ValueError("Rows and columns must be positive numbers")
+    if rows > MAX_ROWS:
+        raise ValueError(f"At most {MAX_ROWS} rows (A-{chr(64 + MAX_ROWS)})")
+
+
+def encode_seat_ranges(seats: Iterable[str]) -> str:
+    """Compact a set of seats into runs per row, e.g. 'A1-20,B3,B7-9'."""
+    by_row: Dict[str, List[int]] = {}
+    for label in seats:
+        row, col = _split_label(label)
+        by_row.setdefault(row, []).append(col)
+    parts = []
+    for row in sorted(by_row):
+        runs = []
+        for col in sorted(set(by_row[row])):
+            if runs and col == runs[-1][1] + 1:
+                runs[-1][1] = col
+            else:
+                runs.append([col, col])
+        parts.extend(f"{row}{first}" if first == last else f"{row}{first}-{last}" for first, last in runs)
+    return ",".join(parts)
+
+
+def decode_seat_ranges(value: str) -> List[str]:
+    """Expand an encoded seat list; plain comma-separated labels decode as-is."""
+    seats = []
+    for part in (value or "").replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            row, first = _split_label(start)
+            seats.extend(f"{row}{col}" for col in range(first, int(end) + 1))
+        else:
+            seats.append(part)
+    return seats
+
+
+def parse_range_spec(spec: str, rows: int, cols: int) -> Set[str]:
+    """Seats covered by a range spec on a rows x cols grid.
+
+    'B' is row B, '#3' column 3, 'C7' one seat and 'A1:C5' the rectangle
+    between two corners. Several specs can be separated by commas.
+    Raises ValueError for a spec it can't read.
+    """
+    seats: Set[str] = set()
+    for part in spec.upper().replace(" ", "").split(","):
+        if not part:
+            continue
+        if part.startswith("#"):
+            if not part[1:].isdigit():
+                raise ValueError(f"invalid column {part!r}, expected e.g. '#3'")
+            col = int(part[1:])
+            seats.update(seat_label(r, col) for r in range(rows))
+        elif len(part) == 1 and "A" <= part <= "Z":
+            seats.update(seat_label(ord(part) - 65, c) for c in range(1, cols + 1))
+        else:
+            first, _, last = part.partition(":")
+            (row1, col1), (row2, col2) = _split_label(first), _split_label(last or first)
+            row_range = range(ord(min(row1, row2)) - 65, ord(max(row1, row2)) - 64)
+            col_range = range(min(col1, col2), max(col1, col2) + 1)
+            seats.update(seat_label(r, c) for r in row_range for c in col_range)
+    return {s for s in seats if 0 <= ord(s[0]) - 65 < rows and 1 <= int(s[1:]) <= cols}
@@ -1,10 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
 from database_operations import *
 from datetime import datetime, date, timedelta
 import json
 from functools import wraps
 import threading
 import socket
+import uuid
+from admission import AdmissionController
+from archive import archive_past_shows
+from config import ARCHIVE_AFTER_DAYS, IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB, SERVER_ID, SERVER_PORT
+from image_cache import IMAGE_SIZES, ImageCache, content_type
+from metrics import Metrics
+import query_stats
+from sessions import issue_token, verify_token
+
+# Booking-path requests allowed to run at once per event; the rest queue.
+BOOKING_MAX_ACTIVE = 20
+admission = AdmissionController(max_active=BOOKING_MAX_ACTIVE)
+
+# Clients drop a server they haven't heard from in about three announcements
+ANNOUNCE_INTERVAL = 2
 
 def get_local_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -18,20 +33,105 @@ def get_local_ip():
         s.close()
     return ip
 
+def announcement(server_id, ip):
+    """What udp_broadcast sends: where to reach this server and how busy it is."""
+    return json.dumps({
+        "id": server_id,
+        "ip": ip,
+        "port": SERVER_PORT,
+        "in_flight": metrics.in_flight(),
+        "queue_depth": admission.stats()["queue_depth"],
+    }).encode("utf-8")
+
 def udp_broadcast():
     broadcast_ip = "255.255.255.255"
     port = 37020
-    message = get_local_ip().encode("utf-8")
+    ip = get_local_ip()
+    server_id = SERVER_ID or f"{ip}:{SERVER_PORT}"
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
     while True:
-        sock.sendto(message, (broadcast_ip, port))
-        time.sleep(5)
+        sock.sendto(announcement(server_id, ip), (broadcast_ip, port))
+        time.sleep(ANNOUNCE_INTERVAL)
+
+def nightly_maintenance():
+    """Rebuild event_summary at start; after every midnight roll it forward, archive past
+    shows, trim the catalog change feed and clear expired seat holds."""
+    rebuild = True
+    while True:
+        try:
+            refreshed = refresh_event_summary(rebuild=rebuild)
+            print("Event summary rebuilt" if rebuild else f"Event summary: rolled forward {refreshed} events")
+            rebuild = False
+        except Exception as e:
+            print(f"Event summary refresh failed: {e}")
+        try:
+            print(f"Archived past shows: {archive_past_shows(db, keep_days=ARCHIVE_AFTER_DAYS)}")
+            prune_catalog_changes()
+            purge_seat_holds()
+        except Exception as e:
+            print(f"Archiving past shows failed: {e}")
+        tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+        time.sleep((tomorrow - datetime.now()).total_seconds() + 1)
 
 app = Flask(__name__)
 
+# Browsers and the client may reuse a served image this long without asking again;
+# the cache fetches the source again after the same time
+IMAGE_MAX_AGE = 86400
+images = ImageCache(IMAGE_CACHE_DIR, int(IMAGE_CACHE_MAX_MB * 1024 * 1024), refresh_after=IMAGE_MAX_AGE)
+
+metrics = Metrics()
+# Each component's `stats` dict holds its lifetime counters; the rest are gauges
+metrics.register_collector("db_pool", db.pool_stats, counters=db.stats)
+metrics.register_collector("prepared_statements", db.statements.prepared_stats, counters=db.statements.stats)
+metrics.register_collector("booking_writes", lambda: dict(booking_writes.stats, pending=booking_writes.pending()),
+                           counters=booking_writes.stats)
+metrics.register_collector("waiting_room", lambda: admission.stats())
+metrics.register_collector("image_cache", images.cache_stats, counters=images.stats)
+
+if replicas:
+    metrics.register_collector("replicas", replicas.replica_stats, counters=replicas.stats)
+
+if query_log:
+    metrics.register_collector("queries", query_log.summary, counters=("queries", "seconds", "slow"))
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.metrics_start = time.perf_counter()
+    g.metrics_status = 500
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.serialize_seconds = 0.0
+    reset_db_time()
+    metrics.request_started(g.metrics_route)
+    if query_log:
+        query_log.begin_request()
+
+@app.after_request
+def record_response_status(response):
+    g.metrics_status = response.status_code
+    total = time.perf_counter() - g.metrics_start
+    response.headers["X-Request-ID"] = g.request_id
+    response.headers["Server-Timing"] = (
+        f"db;dur={get_db_time() * 1000:.2f}, "
+        f"serialize;dur={g.serialize_seconds * 1000:.2f}, "
+        f"total;dur={total * 1000:.2f}"
+    )
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if "metrics_start" in g:
+        seconds = time.perf_counter() - g.metrics_start
+        metrics.request_finished(g.metrics_route, seconds, exc is not None or g.metrics_status >= 500)
+    if query_log:
+        counts = query_log.end_request()
+        if counts and sum(counts.values()) >= query_stats.REPEAT_WARNING:
+            print(f"{request.path} ran {sum(counts.values())} queries")
+
 def json_serial(obj):
     """JSON serializer for objects not serializable by default json code"""
     if isinstance(obj, (datetime, date)):
@@ -50,13 +150,50 @@ def api_response(func):
     def wrapper(*args, **kwargs):
         try:
             result = func(*args, **kwargs)
+            start = time.perf_counter()
             # Convert result to JSON-serializable format
             response_data = json.loads(json.dumps(result, default=json_serial))
-            return jsonify(response_data)
+            response = jsonify(response_data)
+            g.serialize_seconds = time.perf_counter() - start
+            return response
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     return wrapper
 
+def admission_controlled(func):
+    """Queue booking-path requests per event once the event is at capacity.
+
+    A request that can't be admitted in time gets a 429 with a queue token;
+    sending it back in the X-Queue-Token header keeps the caller's place.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        data = request.get_json(silent=True) or {}
+        event_id = str(request.args.get("event_id") or data.get("event_id"))
+        token = request.headers.get("X-Queue-Token")
+        admitted, token, position = admission.acquire(event_id, token)
+        if not admitted:
+            response = jsonify({"queued": True, "queue_token": token, "position": position})
+            response.headers["Retry-After"] = str(admission.retry_after)
+            return response, 429
+        try:
+            return func(*args, **kwargs)
+        finally:
+            admission.release(event_id)
+    return wrapper
+
+def require_session(func):
+    """Reject requests without a valid session token; sets g.username."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        auth = request.headers.get("Authorization", "")
+        username = verify_token(auth[len("Bearer "):]) if auth.startswith("Bearer ") else None
+        if not username:
+            return jsonify({"error": "Login required"}), 401
+        g.username = username
+        return func(*args, **kwargs)
+    return wrapper
+
 @app.route("/get_event_name")
 @api_response
 def api_get_event_name():
@@ -72,7 +209,7 @@ def api_list_events():
     event_type = request.args.get("event_type")
     print(event_type)
     # print(list_events(event_type))
-    return list_events(event_type)
+    return list_events(event_type, include_shows=request.args.get("include_shows") == "1")
 
 @app.route("/get_event_shows")
 @api_response
@@ -83,6 +220,38 @@ def api_get_event_shows():
         raise ValueError("event_name parameter is required")
     return get_event_shows(event_name)
 
+@app.route("/catalog_changes")
+@api_response
+def api_catalog_changes():
+    return get_catalog_changes(int(request.args.get("since", 0)))
+
+@app.route("/image/<path:event_name>")
+def api_event_image(event_name):
+    """The event's image resized for ?size=card (default) or banner, from the disk cache."""
+    size = request.args.get("size", "card")
+    if size not in IMAGE_SIZES:
+        return Response(f"Unknown size {size}", status=400, mimetype="text/plain")
+    url = get_event_image(event_name)
+    if not url:
+        return Response("No image", status=404, mimetype="text/plain")
+    try:
+        data, etag = images.get(url, size)
+    except ValueError as e:
+        # The event's image URL isn't allowed or isn't a usable image
+        print(f"Image for {event_name} refused: {e}")
+        return Response("Image not usable", status=422, mimetype="text/plain")
+    except OSError as e:
+        print(f"Image for {event_name} unavailable: {e}")
+        return Response("Image unavailable", status=502, mimetype="text/plain")
+    except RuntimeError as e:
+        print(f"Image for {event_name} unavailable: {e}")
+        return Response("Image resizing unavailable", status=503, mimetype="text/plain")
+    response = Response(data, mimetype=content_type(url))
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = IMAGE_MAX_AGE
+    return response.make_conditional(request)
+
 @app.route("/get_event_types")
 @api_response
 def api_get_event_types():
@@ -94,7 +263,9 @@ def api_register_user():
     data = request.get_json()
     if not all(k in data for k in ['username', 'password', 'name']):
         raise ValueError("Missing required fields: username, password, name")
-    return register_user(data['username'], data['password'], data['name'])
+    if not register_user(data['username'], data['password'], data['name']):
+        return False
+    return issue_token(data['username'])
 
 @app.route("/check_credentials", methods=["POST"])
 @api_response
@@ -102,9 +273,12 @@ def api_check_credentials():
     data = request.get_json()
     if not all(k in data for k in ['username', 'password']):
         raise ValueError("Missing required fields: username, password")
-    return check_credentials(data['username'], data['password'])
+    if not check_credentials(data['username'], data['password']):
+        return False
+    return issue_token(data['username'])
 
 @app.route("/get_venue_seats")
+@admission_controlled
 @api_response
 def api_get_venue_seats():
     try:
@@ -119,42 +293,64 @@ def api_get_venue_seats():
     }
 
 @app.route("/lock_seats", methods=["POST"])
+@admission_controlled
 @api_response
 def api_lock_seats():
     data = request.get_json()
     if not all(k in data for k in ['selected_seats', 'event_id']):
         raise ValueError("Missing required fields: selected_seats, event_id")
-    return lock_seats(data['selected_seats'], data['event_id'])
+    return lock_seats(data['selected_seats'], data['event_id'], data.get('hold_id'))
 
 @app.route("/create_ticket", methods=["POST"])
+@require_session
+@admission_controlled
 @api_response
 def api_create_ticket():
     data = request.get_json()
-    if not all(k in data for k in ['event_id', 'username', 'seats']):
-        raise ValueError("Missing required fields: event_id, username, seats")
-    ticket_id = create_ticket(data['event_id'], data['username'], data['seats'])
+    if not all(k in data for k in ['event_id', 'seats']):
+        raise ValueError("Missing required fields: event_id, seats")
+    ticket_id = create_ticket(data['event_id'], g.username, data['seats'], data.get('hold_id'))
     if not ticket_id:
         raise RuntimeError("Failed to create ticket")
     return {"ticket_id": ticket_id}
 
 @app.route("/get_user_tickets")
+@require_session
 @api_response
 def api_get_user_tickets():
-    username = request.args.get("username")
-    if not username:
-        raise ValueError("username parameter is required")
-    return get_user_tickets(username)
+    return get_user_tickets(g.username, int(request.args.get("since", 0)))
 
 @app.route("/release_locked_seats", methods=["POST"])
 @api_response
 def api_release_locked_seats():
     data = request.get_json()
-    if not all(k in data for k in ['event_id', 'seats']):
-        raise ValueError("Missing required fields: event_id, seats")
-    release_locked_seats(data['event_id'], data['seats'])
-    return {"status": "released"}
+    if not all(k in data for k in ['event_id', 'seats', 'hold_id']):
+        raise ValueError("Missing required fields: event_id, seats, hold_id")
+    return {"status": "released", "released": release_locked_seats(data['event_id'], data['seats'], data['hold_id'])}
+
+@app.route("/health")
+def api_health():
+    """Cheap liveness probe for client discovery; doesn't touch the database."""
+    return jsonify({"status": "ok"})
+
+@app.route("/queue_status")
+@api_response
+def api_queue_status():
+    return admission.stats(request.args.get("event_id"))
+
+@app.route("/query_stats")
+@api_response
+def api_query_stats():
+    if not query_log:
+        raise RuntimeError("Query stats are off; start the server with EVENTBITE_QUERY_STATS=1")
+    return {"summary": query_log.summary(), "top": query_log.top(int(request.args.get("limit", 20)))}
+
+@app.route("/metrics")
+def api_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     # Run on all available network interfaces
     threading.Thread(target=udp_broadcast, daemon=True).start()
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    threading.Thread(target=nightly_maintenance, daemon=True).start()
+    app.run(host='0.0.0.0', port=SERVER_PORT, debug=True)
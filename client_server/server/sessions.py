@@ -0,0 +1,80 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+# Tokens signed with a random secret stop working when the server restarts;
+# set EVENTBITE_SESSION_SECRET to keep them valid (and shared between servers).
+SESSION_SECRET = os.environ.get("EVENTBITE_SESSION_SECRET", "").encode("utf-8") or secrets.token_bytes(32)
+SESSION_TTL = 7 * 24 * 3600
+
+# PBKDF2 work factor; raise it as hardware gets faster
+PBKDF2_ITERATIONS = int(os.environ.get("EVENTBITE_PBKDF2_ITERATIONS", 200000))
+HASH_PREFIX = "pbkdf2_sha256"
+
+# hashlib releases the GIL while hashing; hashing runs on the request thread,
+# at most one per core at a time so a burst of logins can't starve other requests
+_hash_slots = threading.BoundedSemaphore(os.cpu_count() or 2)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(SESSION_SECRET, payload, hashlib.sha256).digest()
+
+
+def issue_token(username: str) -> str:
+    """Issue a signed session token for `username` valid for SESSION_TTL seconds."""
+    payload = f"{username}|{int(time.time()) + SESSION_TTL}".encode("utf-8")
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload))}"
+
+
+def verify_token(token: str) -> Optional[str]:
+    """Return the username a token was issued to, or None if it is invalid or expired."""
+    try:
+        payload_part, signature_part = token.split(".")
+        payload = _b64decode(payload_part)
+        if not hmac.compare_digest(_sign(payload), _b64decode(signature_part)):
+            return None
+        username, expires = payload.decode("utf-8").rsplit("|", 1)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if int(expires) < time.time():
+        return None
+    return username
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    with _hash_slots:
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+
+def hash_password(password: str) -> str:
+    """Hash a password for storage as 'pbkdf2_sha256$iterations$salt$hash'."""
+    salt = secrets.token_bytes(16)
+    digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+    return f"{HASH_PREFIX}${PBKDF2_ITERATIONS}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check a password against a stored hash, or a legacy plaintext password."""
+    if not stored.startswith(HASH_PREFIX + "$"):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    _, iterations, salt, digest = stored.split("$")
+    candidate = _pbkdf2(password, _b64decode(salt), int(iterations))
+    return hmac.compare_digest(candidate, _b64decode(digest))
+
+
+def needs_rehash(stored: str) -> bool:
+    """True for plaintext passwords and hashes made with an older work factor."""
+    return not stored.startswith(f"{HASH_PREFIX}${PBKDF2_ITERATIONS}$")
@@ -0,0 +1,135 @@
+import datetime
+import re
+import sqlite3
+from typing import Any, Callable, Optional
+
+from connection import ConnectionManager
+
+# Pragmas for a small server: WAL lets readers run alongside the writer,
+# NORMAL sync is durable across application crashes.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -32000",
+    "PRAGMA mmap_size = 134217728",
+)
+
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\s*$", re.IGNORECASE)
+_INSERT_IGNORE = re.compile(r"^INSERT\s+IGNORE\b", re.IGNORECASE)
+
+
+def _to_timedelta(value: bytes) -> datetime.timedelta:
+    # Times written as strings may be "HH:MM" or carry fractional seconds
+    h, m, s = (value.decode().split(":") + ["0", "0"])[:3]
+    return datetime.timedelta(hours=int(h), minutes=int(m), seconds=float(s))
+
+
+def _from_timedelta(value: datetime.timedelta) -> str:
+    total = int(value.total_seconds())
+    return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+
+
+# Match mysql-connector's types: DATE columns read as date, TIME as timedelta
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIME", _to_timedelta)
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(sep=" "))
+sqlite3.register_adapter(datetime.time, lambda value: value.strftime("%H:%M:%S"))
+sqlite3.register_adapter(datetime.timedelta, _from_timedelta)
+
+
+def _translate(query: str) -> str:
+    """Rewrite the MySQL dialect used by database_operations for SQLite."""
+    query = _INSERT_IGNORE.sub("INSERT OR IGNORE", _FOR_UPDATE.sub("", query.strip()))
+    return query.replace("%s", "?")
+
+
+class SQLiteCursor:
+    """DB-API cursor with mysql-connector's %s placeholders and dictionary rows."""
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def execute(self, query: str, params=()):
+        query = _translate(query)
+        if query[:9].upper() == "SAVEPOINT" and not self._cursor.connection.in_transaction:
+            # MySQL always has a transaction open for a savepoint to nest in; an
+            # outermost SQLite savepoint would commit everything on RELEASE
+            self._cursor.execute("BEGIN")
+        self._cursor.execute(query, tuple(params or ()))
+
+    def executemany(self, query: str, rows):
+        self._cursor.executemany(_translate(query), rows)
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Wraps sqlite3.Connection in the parts of the mysql-connector API we use."""
+
+    dialect = "sqlite"
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._conn.create_function("CURDATE", 0, lambda: datetime.date.today().isoformat())
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
+
+    def cursor(self, dictionary: bool = False) -> SQLiteCursor:
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def executescript(self, script: str) -> None:
+        self._conn.executescript(script)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def is_connected(self) -> bool:
+        return True
+
+    def reconnect(self, attempts: int = 1, delay: float = 0) -> None:
+        pass
+
+
+class SQLiteConnectionManager(ConnectionManager):
+    """ConnectionManager over a local SQLite file instead of a MySQL server."""
+
+    def __init__(self, path: str, pool_size: int = 1, on_connect: Optional[Callable[[Any], None]] = None):
+        super().__init__({"database": path}, pool_size=pool_size, on_connect=on_connect)
+        self.path = path
+
+    def _open(self) -> SQLiteConnection:
+        return SQLiteConnection(self.path)
@@ -0,0 +1,83 @@
+import threading
+import weakref
+from typing import Any, Dict
+
+# Fixed statements run on the hot paths, prepared once per connection.
+# Callers must pass these exact string objects: mysql-connector reuses a
+# prepared cursor's statement only when it is handed the same object.
+STATEMENTS: Dict[str, str] = {
+    "get_event_name": "SELECT EventName FROM Events WHERE EventID = %s",
+    "venue_layout": """
+        SELECT V.RowsColumns, V.NoSeats
+        FROM Events E
+        JOIN Venues V ON E.VenueID = V.VenueID
+        WHERE E.EventID = %s
+    """,
+    "event_tickets": "SELECT Seats FROM tickets WHERE EventID = %s",
+    "event_holds": "SELECT Seat FROM seat_holds WHERE EventID = %s AND (ExpiresAt IS NULL OR ExpiresAt >= %s)",
+    "check_credentials": "SELECT pwd FROM Users WHERE Username = %s LIMIT 1",
+    "create_ticket": "INSERT INTO tickets (TicketID, EventID, Seats, Username) VALUES (%s, %s, %s, %s)",
+}
+
+# Reverse lookup for code that only has the SQL text, like the write batcher
+NAMES_BY_SQL = {sql: name for name, sql in STATEMENTS.items()}
+
+
+class PreparedStatements:
+    """Per-connection cache of prepared cursors, one per named statement.
+
+    The first execute of a statement on a connection prepares it on the
+    server; later executes only send the parameters. SQLite connections
+    get plain cursors, since sqlite3 already caches compiled statements
+    by their text.
+    """
+
+    def __init__(self, statements: Dict[str, str] = None):
+        self.statements = statements or STATEMENTS
+        self._cursors: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.stats = {"prepares": 0, "executes": 0}
+
+    def sql(self, name: str) -> str:
+        return self.statements[name]
+
+    def cursor(self, conn, name: str):
+        """The prepared cursor for `name` on `conn`, creating it on first use."""
+        with self._lock:
+            self.stats["executes"] += 1
+            if getattr(conn, "dialect", "mysql") == "sqlite":
+                return conn.cursor()
+            cursors = self._cursors.setdefault(conn, {})
+            cursor = cursors.get(name)
+            if cursor is None:
+                self.stats["prepares"] += 1
+                cursor = cursors[name] = conn.cursor(prepared=True)
+        return cursor
+
+    def forget(self, conn) -> None:
+        """Drop the cursors for `conn`; its statements died with its session."""
+        with self._lock:
+            self._cursors.pop(conn, None)
+
+    def execute(self, conn, name: str, params: tuple, fetch: str = None) -> Any:
+        """Run statement `name` on `conn`, with dictionary rows like execute_query."""
+        cursor = self.cursor(conn, name)
+        try:
+            cursor.execute(self.statements[name], params)
+            if fetch is None:
+                return cursor.rowcount
+            # Read every row so the statement can be executed again straight away
+            rows = cursor.fetchall()
+        except Exception:
+            # Start this connection's statements afresh rather than trust their state
+            self.forget(conn)
+            raise
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in rows]
+        if fetch == 'one':
+            return rows[0] if rows else None
+        return rows
+
+    def prepared_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, connections=len(self._cursors))
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The server modules import each other as top-level modules, the way server.py runs them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """A ConnectionManager over a fresh SQLite file with the full schema."""
+    from schema import apply_migrations
+    from sqlite_backend import SQLiteConnectionManager
+    db = SQLiteConnectionManager(str(tmp_path / "test.db"), pool_size=4, on_connect=apply_migrations)
+    db.execute("SELECT 1")
+    return db
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from admission import AdmissionController
+
+
+def test_admits_up_to_max_active_then_queues():
+    admission = AdmissionController(max_active=1, wait_timeout=0.05)
+    assert admission.acquire("1") == (True, None, 0)
+    admitted, token, position = admission.acquire("1")
+    assert not admitted and token and position == 1
+    assert admission.stats("1")["queue_depth"] == 1
+
+
+def test_token_keeps_place_and_is_admitted_after_release():
+    admission = AdmissionController(max_active=1, wait_timeout=0.05)
+    admission.acquire("1")
+    _, first, _ = admission.acquire("1")
+    _, second, position = admission.acquire("1")
+    assert position == 2
+    admission.release("1")
+    assert admission.acquire("1", second)[0] is False
+    assert admission.acquire("1", first)[0] is True
+
+
+def test_token_from_another_event_joins_that_event_queue():
+    admission = AdmissionController(max_active=1, wait_timeout=0.05)
+    admission.acquire("a")
+    _, token, _ = admission.acquire("a")
+    # Event b has room: a foreign token is just a new request there
+    assert admission.acquire("b", token) == (True, None, 0)
+    # Event b full: the foreign token gets a place in b's queue instead of an error
+    admitted, new_token, position = admission.acquire("b", token)
+    assert not admitted and new_token != token and position == 1
+
+
+def test_waiting_request_is_admitted_when_a_slot_frees():
+    admission = AdmissionController(max_active=1, wait_timeout=2.0)
+    admission.acquire("1")
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(admission.acquire("1")))
+    waiter.start()
+    admission.release("1")
+    waiter.join()
+    assert result[0][0] is True
+
+
+def test_abandoned_head_is_skipped_within_two_retry_periods():
+    admission = AdmissionController(max_active=1, wait_timeout=0.05, retry_after=0.1)
+    admission.acquire("1")
+    _, gone, _ = admission.acquire("1")
+    _, second, position = admission.acquire("1")
+    assert position == 2
+    admission.release("1")
+    # The head hasn't missed a retry yet, so it keeps its turn
+    assert admission.acquire("1", second)[0] is False
+    time.sleep(0.25)
+    # `gone` never polled again; the next live waiter goes in, well before 30s
+    assert admission.acquire("1", second) == (True, None, 0)
+    assert admission.stats("1")["queue_depth"] == 0
+
+
+def test_head_waiting_in_acquire_is_not_expired():
+    admission = AdmissionController(max_active=1, wait_timeout=0.5, retry_after=0.05)
+    admission.acquire("1")
+    results = {}
+    head = threading.Thread(target=lambda: results.update(head=admission.acquire("1")))
+    head.start()
+    time.sleep(0.2)
+    # The head has waited several retry periods; a newcomer's expiry pass must not drop it
+    second = threading.Thread(target=lambda: results.update(second=admission.acquire("1")))
+    second.start()
+    time.sleep(0.05)
+    admission.release("1")
+    head.join()
+    second.join()
+    assert results["head"][0] is True
+    assert results["second"][0] is False
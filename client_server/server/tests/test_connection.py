@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+from schema import apply_migrations
+from sqlite_backend import SQLiteConnection, SQLiteConnectionManager
+
+
+def test_failed_on_connect_runs_again_on_the_next_connection(tmp_path):
+    calls = []
+
+    def migrate(conn):
+        calls.append(conn)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        apply_migrations(conn)
+
+    db = SQLiteConnectionManager(str(tmp_path / "test.db"), on_connect=migrate)
+    with pytest.raises(sqlite3.OperationalError):
+        db.execute("SELECT 1")
+    assert db.execute("SELECT COUNT(*) FROM seat_holds", fetch='one') == (0,)
+    db.execute("SELECT 1")
+    assert len(calls) == 2
+
+
+def test_failed_rollback_keeps_the_original_error(sqlite_db, monkeypatch):
+    def broken_rollback(self):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(SQLiteConnection, "rollback", broken_rollback)
+    with pytest.raises(ValueError, match="original"):
+        with sqlite_db.transaction():
+            raise ValueError("original")
+    # The broken connection was dropped, not put back in the pool
+    assert sqlite_db.pool_stats()["idle"] == 0
@@ -0,0 +1,119 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from image_cache import ImageCache, check_source
+
+
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "ftp://example.com/a.jpg",
+    "http://127.0.0.1/a.jpg",
+    "http://localhost:5000/a.jpg",
+    "http://10.0.0.5/a.jpg",
+    "http://192.168.1.20/a.jpg",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/a.jpg",
+    "http://[::ffff:127.0.0.1]/a.jpg",
+])
+def test_check_source_refuses_local_and_internal_urls(url):
+    with pytest.raises(ValueError):
+        check_source(url)
+
+
+def test_check_source_allows_public_address():
+    check_source("https://93.184.216.34/a.jpg")
+
+
+class _StaticSource(ImageCache):
+    """ImageCache whose 'downloads' return fixed bytes."""
+
+    def __init__(self, root, source, **kwargs):
+        super().__init__(root, max_bytes=10 * 1024 * 1024, **kwargs)
+        self.source = source
+
+    def _fetch(self, url):
+        self.stats["fetches"] += 1
+        return self.source
+
+
+def _png(color, size=(800, 600)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "PNG")
+    return out.getvalue()
+
+
+def test_resized_jpeg_with_content_etag(tmp_path):
+    cache = _StaticSource(str(tmp_path), _png("red"))
+    data, etag = cache.get("https://img.example/a.png", "card")
+    assert Image.open(io.BytesIO(data)).size == (360, 480)
+    assert cache.get("https://img.example/a.png", "card") == (data, etag)
+    assert cache.stats["fetches"] == 1
+
+
+def test_refetches_after_refresh_and_etag_follows_content(tmp_path):
+    cache = _StaticSource(str(tmp_path), _png("red"), refresh_after=60)
+    _, first = cache.get("https://img.example/a.png", "card")
+    for name in os.listdir(tmp_path):
+        path = os.path.join(tmp_path, name)
+        os.utime(path, (os.stat(path).st_atime, os.stat(path).st_mtime - 120))
+    cache.source = _png("blue")
+    _, second = cache.get("https://img.example/a.png", "card")
+    assert second != first and cache.stats["fetches"] == 2
+
+
+def test_undecodable_source_is_refused_and_not_cached(tmp_path):
+    cache = _StaticSource(str(tmp_path), b"<html>not an image</html>")
+    with pytest.raises(ValueError):
+        cache.get("https://img.example/a.png", "card")
+    assert os.listdir(tmp_path) == []
+
+
+def test_decompression_bomb_is_refused(tmp_path, monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    cache = _StaticSource(str(tmp_path), _png("red", (200, 200)))
+    with pytest.raises(ValueError):
+        cache.get("https://img.example/a.png", "card")
+
+
+def test_fetch_connects_only_to_the_address_it_checked(tmp_path, monkeypatch):
+    import http.server
+    import socket
+    import threading
+
+    requests_seen = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(_png("red"))
+
+        def log_message(self, *args):
+            pass
+
+    internal = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=internal.serve_forever, daemon=True).start()
+    port = internal.server_address[1]
+    real_getaddrinfo = socket.getaddrinfo
+    answers = []
+
+    def rebinding_getaddrinfo(host, *args, **kwargs):
+        if host != "rebind.example":
+            return real_getaddrinfo(host, *args, **kwargs)
+        # Public for the first lookup, the server's own loopback after that
+        ip = "93.184.216.34" if not answers else "127.0.0.1"
+        answers.append(ip)
+        return real_getaddrinfo(ip, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", rebinding_getaddrinfo)
+    cache = ImageCache(str(tmp_path), max_bytes=10 * 1024 * 1024, fetch_timeout=2)
+    try:
+        with pytest.raises(ValueError):
+            cache.get(f"http://rebind.example:{port}/a.png", "card")
+    finally:
+        internal.shutdown()
+    assert requests_seen == [] and len(answers) == 2
@@ -0,0 +1,89 @@
+import time
+
+from seat_holds import HOLD_SECONDS, claim_seats, purge_expired_holds, release_seats
+
+
+def _claim(db, seats, holder, ticket_id=None, event_id=1, now=None):
+    with db.transaction() as cursor:
+        return claim_seats(cursor, event_id, seats, holder, ticket_id, now=now)
+
+
+def _rows(db, event_id=1):
+    return db.execute("SELECT Seat, Holder, TicketID FROM seat_holds WHERE EventID = %s ORDER BY Seat",
+                      (event_id,), fetch='all')
+
+
+def test_second_holder_is_refused_and_claims_nothing(sqlite_db):
+    assert _claim(sqlite_db, ["A1", "A2"], "first") == []
+    assert _claim(sqlite_db, ["A2", "A3"], "second") == ["A2"]
+    # All or nothing: A3 was free but isn't held by the refused claim
+    assert _rows(sqlite_db) == [("A1", "first", None), ("A2", "first", None)]
+
+
+def test_holds_on_other_events_do_not_conflict(sqlite_db):
+    assert _claim(sqlite_db, ["A1"], "first", event_id=1) == []
+    assert _claim(sqlite_db, ["A1"], "second", event_id=2) == []
+
+
+def test_booking_takes_over_own_hold_and_blocks_others(sqlite_db):
+    assert _claim(sqlite_db, ["A1", "A2"], "first") == []
+    assert _claim(sqlite_db, ["A1", "A2"], "second", ticket_id=7) == ["A1", "A2"]
+    assert _claim(sqlite_db, ["A1", "A2"], "first", ticket_id=8) == []
+    assert _rows(sqlite_db) == [("A1", "first", 8), ("A2", "first", 8)]
+    # Booked seats stay taken, even for the holder's next claim
+    assert _claim(sqlite_db, ["A1"], "first") == ["A1"]
+    with sqlite_db.transaction() as cursor:
+        assert release_seats(cursor, 1, ["A1"], "first") == 0
+
+
+def test_expired_hold_can_be_taken(sqlite_db):
+    now = int(time.time())
+    assert _claim(sqlite_db, ["A1"], "first", now=now - HOLD_SECONDS - 1) == []
+    assert _claim(sqlite_db, ["A1"], "second", now=now) == []
+    assert _rows(sqlite_db) == [("A1", "second", None)]
+
+
+def test_purge_and_release(sqlite_db):
+    now = int(time.time())
+    _claim(sqlite_db, ["A1"], "old", now=now - HOLD_SECONDS - 1)
+    _claim(sqlite_db, ["B1", "B2"], "live")
+    with sqlite_db.transaction() as cursor:
+        assert purge_expired_holds(cursor) == 1
+        assert release_seats(cursor, 1, ["B1", "B2"], "someone else") == 0
+        assert release_seats(cursor, 1, ["B1"], "live") == 1
+    assert _rows(sqlite_db) == [("B2", "live", None)]
+
+
+class _SnapshotCursor:
+    """Cursor standing in for MySQL under REPEATABLE READ after another server's
+    hold committed: writes see that hold, a plain SELECT does not."""
+
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query, params=()):
+        self.queries.append(query)
+
+    def executemany(self, query, rows):
+        self.queries.append(query)
+
+    def fetchall(self):
+        select = self.queries[-1]
+        # Only a locking read returns the other server's row
+        return [("A1", "other-server", None)] if select.rstrip().endswith("FOR UPDATE") else []
+
+
+def test_claim_checks_with_a_locking_read_and_counts_missing_rows():
+    cursor = _SnapshotCursor()
+    assert claim_seats(cursor, 1, ["A1"], "mine") == ["A1"]
+    assert "ROLLBACK TO SAVEPOINT claim_seats" in cursor.queries
+
+
+class _EmptyCursor(_SnapshotCursor):
+    def fetchall(self):
+        return []
+
+
+def test_seat_missing_from_the_check_is_a_conflict():
+    cursor = _EmptyCursor()
+    assert claim_seats(cursor, 1, ["A1", "A2"], "mine") == ["A1", "A2"]
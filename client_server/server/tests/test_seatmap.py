@@ -0,0 +1,48 @@
+import pytest
+
+from seatmap import (check_grid_size, decode_seat_ranges, encode_seat_ranges, parse_range_spec,
+                     parse_seat_list, seat_label)
+
+
+def test_range_spec_rows_columns_and_rectangles():
+    assert parse_range_spec("B", 3, 3) == {"B1", "B2", "B3"}
+    assert parse_range_spec("#2", 3, 3) == {"A2", "B2", "C2"}
+    assert parse_range_spec("c3:b2", 5, 5) == {"B2", "B3", "C2", "C3"}
+    assert parse_range_spec("A1, C3", 3, 3) == {"A1", "C3"}
+
+
+def test_range_spec_is_clipped_to_the_grid():
+    assert parse_range_spec("A1:Z9", 2, 2) == {"A1", "A2", "B1", "B2"}
+    assert parse_range_spec("#7", 2, 2) == set()
+
+
+def test_missing_second_corner_is_a_single_seat():
+    assert parse_range_spec("A1:", 3, 3) == {"A1"}
+
+
+@pytest.mark.parametrize("spec", [":C5", "A1:C", "#", "#x", "1A", "AA1", "A1-3"])
+def test_malformed_range_spec_raises_value_error(spec):
+    with pytest.raises(ValueError):
+        parse_range_spec(spec, 3, 3)
+
+
+def test_grid_size_limits():
+    check_grid_size(26, 100)
+    for rows, cols in ((0, 5), (5, 0), (27, 5)):
+        with pytest.raises(ValueError):
+            check_grid_size(rows, cols)
+    with pytest.raises(ValueError):
+        seat_label(26, 1)
+
+
+def test_seat_ranges_round_trip():
+    seats = ["A1", "A2", "A3", "B7", "C2", "C3"]
+    encoded = encode_seat_ranges(seats)
+    assert encoded == "A1-3,B7,C2-3"
+    assert decode_seat_ranges(encoded) == seats
+
+
+def test_parse_seat_list_accepts_json_and_commas():
+    assert parse_seat_list('["A1", "B2"]') == ["A1", "B2"]
+    assert parse_seat_list("A1, B2") == ["A1", "B2"]
+    assert parse_seat_list(None) == []
@@ -0,0 +1,56 @@
+import json
+import threading
+
+from statements import STATEMENTS
+from write_batcher import WriteBatcher
+
+
+def _book(batcher, ticket_id, event_id, seats):
+    params = (ticket_id, event_id, json.dumps(seats), "user")
+    return batcher.submit(STATEMENTS["create_ticket"], params, event_id, seats, holder=f"h{ticket_id}", ticket_id=ticket_id)
+
+
+def _submit_together(batcher, writes):
+    """Submit writes from separate threads inside one batching window."""
+    results = {}
+
+    def run(key, write):
+        try:
+            results[key] = write()
+        except Exception as e:
+            results[key] = e
+
+    threads = [threading.Thread(target=run, args=(key, write)) for key, write in writes.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_batch_commits_writes_and_reports_conflicts(sqlite_db):
+    batcher = WriteBatcher(sqlite_db.connect, window=0.2)
+    results = _submit_together(batcher, {
+        1: lambda: _book(batcher, 1, 7, ["A1"]),
+        2: lambda: _book(batcher, 2, 7, ["A2"]),
+    })
+    assert results == {1: [], 2: []}
+    assert _book(batcher, 3, 7, ["A1", "A3"]) == ["A1"]
+    assert sqlite_db.execute("SELECT COUNT(*) FROM tickets", fetch='one')[0] == 2
+
+
+def test_failing_write_does_not_fail_the_rest_of_its_batch(sqlite_db):
+    sqlite_db.execute("INSERT INTO tickets (TicketID, EventID, Seats, Username) VALUES (99, '8', '[]', 'old')")
+    batcher = WriteBatcher(sqlite_db.connect, window=0.2)
+    results = _submit_together(batcher, {
+        "good": lambda: _book(batcher, 10, 7, ["B1"]),
+        "duplicate": lambda: _book(batcher, 99, 7, ["B2"]),
+        "other": lambda: _book(batcher, 11, 9, ["B1"]),
+    })
+    assert results["good"] == [] and results["other"] == []
+    assert isinstance(results["duplicate"], Exception)
+    assert batcher.stats["split_batches"] == 1
+    booked = sqlite_db.execute("SELECT TicketID FROM tickets ORDER BY TicketID", fetch='all')
+    assert [row[0] for row in booked] == [10, 11, 99]
+    # The failed booking's seat claim was rolled back with it
+    assert sqlite_db.execute("SELECT Seat FROM seat_holds WHERE EventID = 7 ORDER BY Seat", fetch='all') == [("B1",)]
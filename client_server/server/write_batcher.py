@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from seat_holds import claim_seats
+from seatmap import parse_seat_list
+from statements import NAMES_BY_SQL, PreparedStatements
+
+
+class _PendingWrite:
+    def __init__(self, query: Optional[str], params: tuple, event_id: Any, seats: List[str], holder: str,
+                 ticket_id: Optional[int]):
+        self.query = query
+        self.params = params
+        self.event_id = str(event_id)
+        self.seats = seats
+        self.holder = holder
+        self.ticket_id = ticket_id
+        self.future = Future()
+
+
+class WriteBatcher:
+    """Group-commit seat holds and booking inserts.
+
+    Callers submit the seats they claim for a holder, with the INSERT to
+    run if the claim succeeds (or none, for a plain hold). A single writer
+    thread collects everything that arrives within `window` seconds,
+    drops writes whose seats are on an existing ticket or already claimed
+    in seat_holds (by another server, or an earlier write in the same
+    batch) and commits the rest with one executemany per statement inside
+    a single transaction. A statement with a single row runs as a
+    prepared statement when it is one of the named statements in
+    statements.py. If a batch fails, its writes are retried one by one so
+    the error only reaches the caller whose write caused it.
+    """
+
+    def __init__(self, connect: Callable[[], Any], window: float = 0.005, max_batch: int = 256,
+                 statements: PreparedStatements = None):
+        self._connect = connect
+        self.statements = statements
+        self._conn = None
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self.stats = {"batches": 0, "writes": 0, "conflicts": 0, "errors": 0, "split_batches": 0}
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, query: Optional[str], params: tuple, event_id: Any, seats: List[str], holder: str,
+               ticket_id: Optional[int] = None) -> List[str]:
+        """Queue a write and wait for its batch to commit.
+
+        The seats are held for `holder`, or booked to `ticket_id` when given
+        (see seat_holds.claim_seats).
+
+        Returns:
+            The seats that conflicted; an empty list means the write was committed.
+        """
+        write = _PendingWrite(query, params, event_id, seats, holder, ticket_id)
+        self._queue.put(write)
+        return write.future.result()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _connection(self):
+        if self._conn is None or not self._conn.is_connected():
+            self._conn = self._connect()
+        return self._conn
+
+    def _commit(self, batch: List[_PendingWrite]) -> None:
+        try:
+            conn = self._connection()
+            cursor = conn.cursor()
+            booked = self._booked_seats(cursor, batch)
+            results: Dict[_PendingWrite, List[str]] = {}
+            rows_by_query: Dict[str, List[tuple]] = {}
+            for write in batch:
+                taken = booked.get(write.event_id, set())
+                conflicts = [seat for seat in write.seats if seat in taken]
+                if not conflicts:
+                    conflicts = claim_seats(cursor, write.event_id, write.seats, write.holder, write.ticket_id)
+                results[write] = conflicts
+                if conflicts or write.query is None:
+                    continue
+                rows_by_query.setdefault(write.query, []).append(write.params)
+            for query, rows in rows_by_query.items():
+                name = NAMES_BY_SQL.get(query)
+                if len(rows) == 1 and name and self.statements:
+                    self.statements.execute(conn, name, rows[0])
+                else:
+                    cursor.executemany(query, rows)
+            conn.commit()
+            cursor.close()
+        except Exception as e:
+            print(f"Database error in batched write: {e}")
+            try:
+                self._conn.rollback()
+            except Exception:
+                self._conn = None
+            self.stats["errors"] += 1
+            if len(batch) > 1:
+                # One bad write shouldn't fail everyone who shared its window:
+                # commit them one at a time so only the offender gets the error
+                self.stats["split_batches"] += 1
+                for write in batch:
+                    self._commit([write])
+                return
+            batch[0].future.set_exception(e)
+            return
+        self.stats["batches"] += 1
+        self.stats["writes"] += len(batch)
+        self.stats["conflicts"] += sum(1 for conflicts in results.values() if conflicts)
+        for write in batch:
+            write.future.set_result(results[write])
+
+    def _booked_seats(self, cursor, batch: List[_PendingWrite]) -> Dict[str, Set[str]]:
+        """Seats on tickets for every event touched by the batch.
+
+        Bookings made through seat_holds also hold their seats there; this
+        covers tickets sold before the table existed.
+        """
+        event_ids = sorted({write.event_id for write in batch})
+        placeholders = ", ".join(["%s"] * len(event_ids))
+        booked: Dict[str, Set[str]] = {}
+        cursor.execute(f"SELECT EventID, Seats FROM tickets WHERE EventID IN ({placeholders})", event_ids)
+        for event_id, seats in cursor.fetchall():
+            booked.setdefault(str(event_id), set()).update(parse_seat_list(seats))
+        return booked